@@ -37,7 +37,9 @@ echo.
 echo -----------------------------------------------------------
 echo Ejecutando %SCRIPT% %D_INI% %D_FIN%
 echo -----------------------------------------------------------
-python "%SCRIPT%" %D_INI% %D_FIN%
+:: (a través de altas_cliente.py: si el servidor residente está en marcha,
+::  el informe sale de él; si no, el script se ejecuta aquí como siempre)
+python "%SCRIPT_DIR%\altas_cliente.py" "%SCRIPT%" %D_INI% %D_FIN%
 
 if errorlevel 1 (
     echo.
@@ -0,0 +1,18 @@
+@echo off
+REM ======================================================================
+REM  Servidor residente de los checks (altas_servidor.py)
+REM  → Déjalo abierto: los Ejecuta_*.bat le pasan sus peticiones y los
+REM    informes salen sin volver a cargar Python, pandas ni el libro.
+REM ======================================================================
+
+set "SCRIPT_DIR=%USERPROFILE%\OneDrive\ESCRITORIO IBERDROLA\PROGRAMACION\Proyecto_Check_Altas"
+
+if not exist "%SCRIPT_DIR%\altas_servidor.py" (
+    echo ERROR: No se encuentra %SCRIPT_DIR%\altas_servidor.py
+    pause
+    exit /b 1
+)
+
+title Servidor de altas
+python "%SCRIPT_DIR%\altas_servidor.py"
+pause
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+altas_bd.py
+-----------
+Histórico en SQLite («<libro>.sqlite», junto al Excel) de las filas ya
+normalizadas de cada hoja de mes (perfil «mes») y de TRAMITACION y sus 2
+siguientes (perfil «tram»).
+
+Ingesta (también la hacen los scripts con --bd antes de consultar):
+    python altas_bd.py ["ruta\\2025_TRAMITACION_DE_ALTAS.xlsx"]
+
+Consulta desde los informes, con la misma forma que CacheAltas.cargar():
+    bd     = BaseAltas(SRC_XLS)
+    bd.ingerir(cache)
+    frames = bd.cargar([("MAYO", "mes"), ("TRAMITACION", "tram")], d_ini, d_fin)
+
+Con fechas solo salen las filas candidatas del periodo (FECHA FIRMA entre
+d_ini y d_fin, o alguna CAIDA desde d_ini), seleccionadas por índice; con
+esas filas preparar() y calcular_periodo() dan lo mismo que con la hoja
+entera, porque los duplicados solo se resuelven entre candidatas.
+
+Cada hoja se guarda con su huella (altas_cache) y cada fila con la suya
+(valores + número de fila, altas_normaliza.huellas_filas): al ingerir solo se
+miran las hojas cuya huella ha cambiado y, de ellas, solo se borran las filas
+que ya no están tal cual y se insertan las nuevas o editadas. Las hojas que
+ya no están en el libro se quedan en la base: el histórico sobrevive aunque
+se borren meses antiguos del Excel.
+
+Cada fila guarda sus valores tal cual (con el tipo de cada celda, como la
+caché) y, aparte e indexados, COLABORADOR, PLAN, CUPS (o DNI/CIF) y las
+fechas FECHA FIRMA, FECHA ALTA, CAIDAS_E_Y_G y CAIDAS_P&S ya convertidas.
+"""
+from __future__ import annotations
+import json, sqlite3, sys
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from altas_cache import CacheAltas, _a_texto, _de_texto, _tipo
+from altas_carga import HOJA_TRAM
+from altas_normaliza import COL_HUELLA, VERSION_PERFILES, fecha_excel, huellas_filas
+
+# Súbelo si cambia el esquema: la base se vuelve a llenar desde el libro
+VERSION_BD = 2
+
+FMT_BD = "%Y-%m-%d %H:%M:%S"            # fechas como texto ordenable
+
+# columna de la base ← columna de la hoja
+COLS_FECHA_BD = {"firma": "FECHA FIRMA", "alta": "FECHA ALTA ORIGINAL",
+                 "caida_eg": "CAIDAS_E_Y_G", "caida_ps": "CAIDAS_P&S"}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS hojas (
+    hoja TEXT, perfil TEXT, huella TEXT, columnas TEXT, filas INTEGER, ingerida TEXT,
+    PRIMARY KEY (hoja, perfil));
+CREATE TABLE IF NOT EXISTS filas (
+    hoja TEXT, perfil TEXT, fila INTEGER, huella INTEGER,
+    colaborador TEXT, plan TEXT, id_cliente TEXT,
+    firma TEXT, alta TEXT, caida_eg TEXT, caida_ps TEXT,
+    datos TEXT,
+    PRIMARY KEY (hoja, perfil, fila)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_firma    ON filas (hoja, perfil, firma);
+CREATE INDEX IF NOT EXISTS ix_alta     ON filas (hoja, perfil, alta);
+CREATE INDEX IF NOT EXISTS ix_caida_eg ON filas (hoja, perfil, caida_eg);
+CREATE INDEX IF NOT EXISTS ix_caida_ps ON filas (hoja, perfil, caida_ps);
+CREATE INDEX IF NOT EXISTS ix_colab    ON filas (colaborador);
+CREATE INDEX IF NOT EXISTS ix_clave    ON filas (id_cliente, plan, colaborador);
+"""
+
+
+def hojas_bd(cache) -> list[tuple[str, str]]:
+    """(hoja, perfil) que se guardan: los meses (las hojas que siguen a
+    TRAMITACION) y TRAMITACION con sus 2 siguientes."""
+    hojas = cache.hojas
+    meses = hojas[hojas.index(HOJA_TRAM) + 1:] if HOJA_TRAM in hojas else []
+    return [(h, "mes") for h in meses] + [(h, "tram") for h in cache.hojas_tram]
+
+
+def _texto_fecha(serie) -> list:
+    f = fecha_excel(serie)[0]
+    return f.dt.strftime(FMT_BD).where(f.notna(), None).tolist()
+
+
+def _a_filas(hoja, perfil, df, huellas):
+    """Filas de df listas para INSERT (ver ESQUEMA); huellas: una por fila."""
+    n = len(df)
+    vacia = [None] * n
+
+    def texto(col):
+        if col not in df.columns:
+            return vacia
+        return [None if pd.isna(v) else str(v) for v in df[col]]
+
+    cliente = texto("CUPS") if "CUPS" in df.columns else texto("DNI/CIF")
+    fechas  = [_texto_fecha(df[c]) if c in df.columns else vacia for c in COLS_FECHA_BD.values()]
+
+    # valores por columna con su tipo (como la caché de altas_cache)
+    celdas = []
+    for col in df.columns:
+        vals = df[col].astype(object).tolist()
+        celdas.append([(t, _a_texto(v, t)) for v, t in zip(vals, map(_tipo, vals))])
+    datos = [json.dumps(fila, ensure_ascii=False) for fila in zip(*celdas)] if celdas else ["[]"] * n
+
+    return zip([hoja] * n, [perfil] * n, df.index.tolist(), huellas,
+               texto("COLABORADOR"), texto("PLAN"), cliente, *fechas, datos)
+
+
+def _de_filas(columnas, filas) -> pd.DataFrame:
+    """DataFrame con las columnas y tipos guardados a partir de (fila, datos)."""
+    nombres = [c for c, _ in columnas]
+    celdas  = [json.loads(d) for _, d in filas]
+    df = pd.DataFrame({c: pd.Series([_de_texto(v, t) for t, v in
+                                     (fila[j] for fila in celdas)], dtype=object)
+                       for j, c in enumerate(nombres)},
+                      columns=nombres)
+    for c, dtype in columnas:
+        if dtype != "object":
+            df[c] = df[c].astype(dtype)
+    df.index = pd.Index([f for f, _ in filas], dtype="int64")
+    return df
+
+
+class BaseAltas:
+    """
+    >>> bd = BaseAltas(SRC_XLS)
+    >>> bd.ingerir(CacheAltas(SRC_XLS))
+    >>> frames = bd.cargar([("MAYO", "mes")], d_ini, d_fin)
+    """
+
+    def __init__(self, src, ruta=None):
+        self.src  = Path(src)
+        self.ruta = Path(ruta) if ruta else self.src.with_suffix(".sqlite")
+        self.con  = sqlite3.connect(self.ruta)
+        self.con.execute("CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)")
+        version = self.con.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()
+        if version is None or int(version[0]) != VERSION_BD:
+            with self.con:                  # otro esquema → se vuelve a llenar
+                self.con.execute("DROP TABLE IF EXISTS filas")
+                self.con.execute("DROP TABLE IF EXISTS hojas")
+                self.con.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                                 (str(VERSION_BD),))
+        self.con.executescript(ESQUEMA)
+
+    def huellas(self) -> dict[tuple[str, str], str]:
+        return dict(((h, p), x) for h, p, x in
+                    self.con.execute("SELECT hoja, perfil, huella FROM hojas"))
+
+    def hojas(self) -> list[str]:
+        return [h for (h,) in self.con.execute("SELECT DISTINCT hoja FROM hojas ORDER BY hoja")]
+
+    # ---------------------------------------------------------------------
+    def ingerir(self, cache: CacheAltas, peticiones=None, avisar=True) -> list:
+        """
+        Vuelca a la base las (hoja, perfil) cuya huella ha cambiado (por
+        defecto, hojas_bd()). Las filas salen de la caché de altas_cache, a
+        través de su hilo (no compite con una precarga en curso). Devuelve
+        las que se han actualizado.
+        """
+        peticiones = list(peticiones or hojas_bd(cache))
+        guardadas  = self.huellas()
+        huella = {p: f"{VERSION_PERFILES}:{cache.huellas[p[0]]}" for p in peticiones}
+        faltan = [p for p in peticiones if guardadas.get(p) != huella[p]]
+        if not faltan:
+            return []
+
+        frames = cache.en_segundo_plano(faltan, con_huellas=True).result()
+        cambios = {}
+        try:
+            with self.con:
+                for (hoja, perfil), df in frames.items():
+                    # filas que ya no están tal cual → fuera; nuevas o editadas → dentro
+                    # (caché de antes de las huellas por fila → huella del resultado)
+                    h = df.pop(COL_HUELLA).to_numpy(dtype=np.uint64) if COL_HUELLA in df else huellas_filas(df)
+                    ahora = dict(zip(df.index.tolist(), h.view(np.int64).tolist()))
+                    antes = dict(self.con.execute("SELECT fila, huella FROM filas "
+                                                  "WHERE hoja = ? AND perfil = ?", (hoja, perfil)))
+                    fuera = [(hoja, perfil, f) for f, h in antes.items() if ahora.get(f) != h]
+                    nuevas = [f for f, h in ahora.items() if antes.get(f) != h]
+                    self.con.executemany("DELETE FROM filas WHERE hoja = ? AND perfil = ? AND fila = ?",
+                                         fuera)
+                    self.con.executemany("INSERT INTO filas VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                                         _a_filas(hoja, perfil, df.loc[nuevas],
+                                                  [ahora[f] for f in nuevas]))
+                    cambios[hoja, perfil] = (len(nuevas), len(fuera))
+                    columnas = [[str(c), str(t)] for c, t in df.dtypes.items()]
+                    self.con.execute("INSERT OR REPLACE INTO hojas VALUES (?,?,?,?,?,?)",
+                                     (hoja, perfil, huella[hoja, perfil],
+                                      json.dumps(columnas, ensure_ascii=False), len(df),
+                                      f"{datetime.now():%Y-%m-%d %H:%M:%S}"))
+        except sqlite3.Error as e:          # base bloqueada (OneDrive…), disco lleno…
+            print(f"⚠️ No se pudo actualizar {self.ruta.name} ({e}); se sigue con lo que tenía.")
+            return []
+        if avisar:
+            print("🗄️  Base actualizada:", ", ".join(f"{h} ({p}) +{n} −{b}"
+                                                     for (h, p), (n, b) in cambios.items()))
+        return faltan
+
+    # ---------------------------------------------------------------------
+    def cargar(self, peticiones, d_ini=None, d_fin=None) -> dict[tuple[str, str], pd.DataFrame]:
+        """
+        Como CacheAltas.cargar() pero desde la base (también hojas que ya no
+        están en el libro). Con d_ini y d_fin, solo las filas candidatas del
+        periodo: FECHA FIRMA en [d_ini, d_fin] o alguna CAIDA desde d_ini.
+        """
+        sql, extra = "SELECT fila, datos FROM filas WHERE hoja = ?1 AND perfil = ?2", ()
+        if d_ini is not None and d_fin is not None:
+            # una búsqueda por índice para cada fecha (con OR, SQLite recorre la hoja)
+            sql += """ AND fila IN (
+                SELECT fila FROM filas WHERE hoja = ?1 AND perfil = ?2 AND firma BETWEEN ?3 AND ?4
+                UNION ALL SELECT fila FROM filas WHERE hoja = ?1 AND perfil = ?2 AND caida_eg >= ?3
+                UNION ALL SELECT fila FROM filas WHERE hoja = ?1 AND perfil = ?2 AND caida_ps >= ?3)"""
+            extra = (f"{pd.Timestamp(d_ini):{FMT_BD}}", f"{pd.Timestamp(d_fin):{FMT_BD}}")
+        sql += " ORDER BY fila"
+
+        frames = {}
+        for hoja, perfil in dict.fromkeys(peticiones):
+            fila = self.con.execute("SELECT columnas FROM hojas WHERE hoja = ? AND perfil = ?",
+                                    (hoja, perfil)).fetchone()
+            if fila is None:
+                raise ValueError(f"No existe la hoja «{hoja}» ({perfil}) en {self.ruta.name}")
+            frames[hoja, perfil] = _de_filas(json.loads(fila[0]),
+                                             self.con.execute(sql, (hoja, perfil, *extra)).fetchall())
+        return frames
+
+    def cerrar(self):
+        self.con.close()
+
+
+# -------------- INGESTA -----------------------------------------------------
+if __name__ == "__main__":
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else \
+          Path(__file__).resolve().parent / "2025_TRAMITACION_DE_ALTAS.xlsx"
+    bd = BaseAltas(src)
+    if not bd.ingerir(CacheAltas(src)):
+        print("✅ La base ya estaba al día.")
+    for (hoja, perfil), n in sorted(
+            ((h, p), n) for h, p, n in bd.con.execute("SELECT hoja, perfil, filas FROM hojas")):
+        print(f"   {hoja:<12} {perfil:<5} {n:>7} filas")
+    bd.cerrar()
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+"""
+altas_cache.py
+--------------
+Caché en disco (Parquet; pickle si no está pyarrow) de las hojas ya
+normalizadas, guardada junto al Excel en «<libro>.cache/».
+
+Validez:
+  · si mtime y tamaño del .xlsx no han cambiado → todo vale, sin abrir nada;
+  · si han cambiado → se calcula una huella por hoja (XML de la hoja + textos
+    compartidos y formatos de número que usa) y solo se vuelven a leer las
+    hojas cuya huella es distinta. El resto sigue saliendo de la caché.
+
+Si hay que leer varias hojas grandes (un libro de todo el año), cada hoja se
+lee y normaliza en su propio proceso y vuelve al principal como un bloque
+Arrow (pickle 5 sin pyarrow), no fila a fila. ALTAS_PROCESOS=1 lo desactiva.
+
+Si una hoja ha cambiado, se vuelve a leer entera, pero solo se normalizan sus
+filas nuevas o editadas: cada fila guardada lleva una huella (valores + número
+de fila, altas_normaliza.aplicar_perfil) y las que coinciden se reutilizan.
+Retocar unas filas de TRAMITACION cuesta la lectura de la hoja y esas filas,
+no todo el histórico. También en paralelo: el proceso hijo recibe las huellas
+anteriores y solo devuelve las filas nuevas o editadas.
+
+Dentro del servidor residente (altas_servidor.py) las hojas cargadas se quedan
+además en memoria entre una petición y otra (MEMORIA); la caché en disco sigue
+siendo la misma.
+
+El .xlsx (en OneDrive) se lee de disco como mucho una vez por ejecución:
+huellas, lectores y procesos trabajan sobre esa copia en memoria (los procesos
+hijos, sobre una copia temporal local).
+"""
+from __future__ import annotations
+import hashlib, io, json, os, pickle, re, sys, tempfile, zipfile
+import multiprocessing as mp
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from altas_carga import LibroAltas, hojas_tramitacion, leer_estable, motor_por_defecto
+from altas_normaliza import (COL_HUELLA, COLS_USADAS, VERSION_PERFILES, aplicar_perfil,
+                             perfil_por_filas, unir_con_previo)
+
+try:
+    import pyarrow as pa
+    FORMATO = "parquet"
+except ImportError:                    # sin pyarrow → pickle
+    pa = None
+    FORMATO = "pkl"
+
+# Lectura en paralelo solo si compensa arrancar los procesos (≈1 s en Windows):
+# bytes de XML pendientes a partir de los cuales se reparte, según el motor.
+UMBRAL_PARALELO = {"calamine": 24_000_000, "openpyxl": 6_000_000}
+
+# {(libro, hoja, perfil): (huella, DataFrame con COL_HUELLA)}; None = desactivada.
+# Solo la activa el servidor residente: un script suelto no la necesita.
+MEMORIA: dict | None = None
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL  = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+RE_SST  = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+RE_XF   = re.compile(rb'<(?:c|row)\b[^>]*?\bs="(\d+)"|<col\b[^>]*?\bstyle="(\d+)"')
+SUF_TIPO = "\x00tipo"                  # columna auxiliar para columnas mezcladas
+
+
+# -------------- HUELLAS -----------------------------------------------------
+def _partes_hojas(zf: zipfile.ZipFile) -> dict[str, str]:
+    """Nombre de hoja → ruta de su XML dentro del .xlsx (en orden del libro)."""
+    wb   = ET.fromstring(zf.read("xl/workbook.xml"))
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    destino = {r.get("Id"): r.get("Target") for r in rels}
+    partes = {}
+    for h in wb.find(f"{NS_MAIN}sheets"):
+        t = destino[h.get(f"{NS_REL}id")].lstrip("/")
+        partes[h.get("name")] = t if t.startswith("xl/") else "xl/" + t
+    return partes
+
+
+def _formatos_estilo(xml: bytes) -> list[bytes]:
+    """Formato de número de cada estilo de celda (cellXfs) de styles.xml: es lo
+    único de los estilos que cambia lo que se lee (fecha o número)."""
+    raiz    = ET.fromstring(xml)
+    codigos = {f.get("numFmtId"): f.get("formatCode", "")
+               for f in raiz.iterfind(f"{NS_MAIN}numFmts/{NS_MAIN}numFmt")}
+    return [f"{xf.get('numFmtId', '0')}:{codigos.get(xf.get('numFmtId', '0'), '')}".encode("utf-8")
+            for xf in raiz.iterfind(f"{NS_MAIN}cellXfs/{NS_MAIN}xf")]
+
+
+def huellas_hojas(src) -> tuple[list[str], dict[str, str]]:
+    """Devuelve (nombres de hoja, huella de cada hoja) sin parsear celdas.
+    src: ruta o fichero en memoria (io.BytesIO)."""
+    with zipfile.ZipFile(src) as zf:
+        partes  = _partes_hojas(zf)
+        nombres = set(zf.namelist())
+        sst = []
+        if "xl/sharedStrings.xml" in nombres:
+            sst = ["".join(si.itertext()).encode("utf-8")
+                   for si in ET.fromstring(zf.read("xl/sharedStrings.xml"))]
+        formatos = []
+        if "xl/styles.xml" in nombres:
+            formatos = _formatos_estilo(zf.read("xl/styles.xml"))
+
+        huellas = {}
+        for hoja, parte in partes.items():
+            xml = zf.read(parte)
+            h = hashlib.sha1(f"v{VERSION_PERFILES}".encode())
+            h.update(xml)
+            for i in RE_SST.findall(xml):
+                h.update(b"\x00" + (sst[int(i)] if int(i) < len(sst) else b""))
+            # solo los formatos de los estilos que usa la hoja: dar formato en
+            # otra hoja (o negrita, colores…) no la invalida; sin «s», estilo 0
+            for i in sorted({0, *(int(a or b) for a, b in RE_XF.findall(xml))}):
+                h.update(b"\x00%d=" % i + (formatos[i] if i < len(formatos) else b""))
+            huellas[hoja] = h.hexdigest()
+    return list(partes), huellas
+
+
+# -------------- SERIALIZACIÓN -----------------------------------------------
+def _tipo(v):
+    if v is None:                    return "n"
+    if v is pd.NaT:                  return "T"
+    if isinstance(v, float) and v != v: return "N"
+    if isinstance(v, bool):          return "b"
+    if isinstance(v, int):           return "i"
+    if isinstance(v, float):         return "f"
+    if isinstance(v, pd.Timestamp):  return "t"
+    if isinstance(v, datetime):      return "d"
+    return "s"
+
+
+def _a_texto(v, t):
+    if t in "nTN":
+        return None
+    if t in "td":
+        return v.isoformat()
+    return str(v)
+
+
+def _de_texto(v, t):
+    if t == "n": return None
+    if t == "T": return pd.NaT
+    if t == "N": return float("nan")
+    if t == "b": return v == "True"
+    if t == "i": return int(v)
+    if t == "f": return float(v)
+    if t == "t": return pd.Timestamp(v)
+    if t == "d": return datetime.fromisoformat(v)
+    return v
+
+
+def _a_columnar(df: pd.DataFrame) -> pd.DataFrame:
+    """Parquet no admite columnas object con tipos mezclados (fechas y texto en
+    FECHA ALTA, números y «-» en POTENCIA…): se guardan como texto más una
+    columna auxiliar con el tipo original de cada celda."""
+    out = {}
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object:
+            tipos = s.map(_tipo)
+            if not tipos.isin(["s", "n"]).all():
+                out[col] = [_a_texto(v, t) for v, t in zip(s, tipos)]
+                out[col + SUF_TIPO] = tipos.to_numpy()
+                continue
+        out[col] = s.to_numpy()
+    return pd.DataFrame(out, index=df.index)
+
+
+def _de_columnar(df: pd.DataFrame) -> pd.DataFrame:
+    for col in [c for c in df.columns if c.endswith(SUF_TIPO)]:
+        base = col[: -len(SUF_TIPO)]
+        df[base] = pd.Series([_de_texto(v, t) for v, t in zip(df[base], df[col])],
+                             index=df.index, dtype=object)
+        del df[col]
+    return df
+
+
+def _a_bytes(df: pd.DataFrame) -> bytes:
+    """DataFrame → bloque Arrow IPC (o pickle 5) para pasarlo entre procesos."""
+    if pa is None:
+        return pickle.dumps(df, protocol=5)
+    tabla = pa.Table.from_pandas(_a_columnar(df))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, tabla.schema) as w:
+        w.write_table(tabla)
+    return sink.getvalue().to_pybytes()
+
+
+def _de_bytes(b: bytes) -> pd.DataFrame:
+    if pa is None:
+        return pickle.loads(b)
+    return _de_columnar(pa.ipc.open_stream(b).read_all().to_pandas())
+
+
+# -------------- LECTURA EN PARALELO -----------------------------------------
+def _tarea_hoja(src, hoja, perfiles):
+    """
+    Proceso hijo: lee una hoja y aplica sus perfiles. perfiles: {perfil:
+    huellas de fila del resultado anterior o None}; solo vuelven las filas
+    nuevas o editadas, más las huellas de las que se reutilizan.
+    """
+    libro = LibroAltas(src, [hoja], con_tramitacion=False, columnas=COLS_USADAS)
+    out = {}
+    for p, previas in perfiles.items():
+        nuevas, iguales = perfil_por_filas(p, libro.hoja(hoja), previas)
+        out[p] = _a_bytes(nuevas), iguales
+    return out
+
+
+def tamanos_xml(src, hojas) -> dict[str, int]:
+    """Bytes (sin comprimir) del XML de cada hoja: lo que cuesta parsearla."""
+    with zipfile.ZipFile(src) as zf:
+        partes = _partes_hojas(zf)
+        return {h: zf.getinfo(partes[h]).file_size for h in hojas}
+
+
+def n_procesos(src, hojas) -> int:
+    """Procesos a usar para leer «hojas» (1 → en este mismo proceso)."""
+    pedido = os.environ.get("ALTAS_PROCESOS", "").strip()
+    maximo = int(pedido) if pedido.isdigit() else (os.cpu_count() or 1)
+    if maximo <= 1 or len(hojas) <= 1:
+        return 1
+    if sum(tamanos_xml(src, hojas).values()) < UMBRAL_PARALELO[motor_por_defecto()]:
+        return 1
+    return min(maximo, len(hojas))
+
+
+@contextmanager
+def _sin_script_principal():
+    """
+    Los scripts de check no tienen «if __name__ == '__main__'»: al arrancar un
+    proceso hijo con spawn (lo único que hay en Windows) se volvería a ejecutar
+    el script entero, preguntas incluidas. Mientras se crean los procesos se
+    oculta de dónde salió __main__; el hijo solo necesita importar este módulo.
+    """
+    main = sys.modules["__main__"]
+    guardado = {k: main.__dict__[k] for k in ("__file__", "__spec__") if k in main.__dict__}
+    main.__dict__.pop("__file__", None)
+    main.__spec__ = None
+    try:
+        yield
+    finally:
+        main.__dict__.pop("__spec__", None)
+        main.__dict__.update(guardado)
+
+
+def leer_en_paralelo(datos, peticiones, procesos, previos=None) -> dict[tuple[str, str], pd.DataFrame]:
+    """
+    datos: contenido del .xlsx; peticiones: lista de (hoja, perfil).
+    Una tarea (y un proceso) por hoja; los hijos leen una copia temporal local,
+    no el fichero de OneDrive. previos: {(hoja, perfil): resultado anterior}
+    (con COL_HUELLA); como en aplicar_perfil, sus filas sin cambios no se
+    vuelven a normalizar ni viajan entre procesos.
+    """
+    previos = previos or {}
+    por_hoja = {}
+    for hoja, perfil in peticiones:
+        previo = previos.get((hoja, perfil))
+        por_hoja.setdefault(hoja, {})[perfil] = None if previo is None else previo.get(COL_HUELLA)
+    tam = tamanos_xml(io.BytesIO(datos), por_hoja)
+    por_hoja = dict(sorted(por_hoja.items(), key=lambda kv: -tam[kv[0]]))  # grandes primero
+    with tempfile.TemporaryDirectory(prefix="altas_") as tmp:
+        copia = Path(tmp) / "libro.xlsx"
+        copia.write_bytes(datos)
+        with _sin_script_principal():
+            ex = ProcessPoolExecutor(procesos, mp_context=mp.get_context("spawn"))
+            tareas = {h: ex.submit(_tarea_hoja, str(copia), h, ps) for h, ps in por_hoja.items()}
+        with ex:
+            return {(h, p): unir_con_previo(_de_bytes(b), iguales, previos.get((h, p)))
+                    for h, t in tareas.items() for p, (b, iguales) in t.result().items()}
+
+
+# -------------- CACHÉ -------------------------------------------------------
+class CacheAltas:
+    """
+    >>> cache  = CacheAltas(SRC_XLS)
+    >>> frames = cache.cargar([("MAYO", "mes"), ("TRAMITACION", "tram")])
+    >>> raw    = frames["MAYO", "mes"]
+
+    Mientras el usuario contesta las preguntas:
+    >>> pendiente = cache.en_segundo_plano([("TRAMITACION", "tram")])
+    >>> frames    = pendiente.result()
+    """
+
+    def __init__(self, src, dir_cache=None):
+        self.src = Path(src)
+        self.dir = Path(dir_cache) if dir_cache else self.src.with_suffix(".cache")
+        self.f_indice = self.dir / "indice.json"
+        self.indice = self._leer_indice()
+
+        st = self.src.stat()
+        self.stat = [st.st_mtime_ns, st.st_size]
+        self._datos = None
+        self._hilo  = None
+        if self.indice.get("stat") == self.stat and self.indice.get("version") == VERSION_PERFILES:
+            self.hojas   = self.indice["hojas"]
+            self.huellas = self.indice["huellas"]
+        else:
+            self.hojas = self.huellas = None
+            self.contenido()
+
+    def contenido(self) -> bytes:
+        """
+        El .xlsx entero, leído de disco una sola vez (y solo si hace falta).
+        Si ha cambiado desde que se abrió la caché, las huellas pasan a ser
+        las de la versión leída.
+        """
+        if self._datos is None:
+            datos, st = leer_estable(self.src)
+            stat = [st.st_mtime_ns, st.st_size]
+            if self.huellas is None or stat != self.stat:
+                self.stat = stat
+                self.hojas, self.huellas = huellas_hojas(io.BytesIO(datos))
+            self._datos = datos
+        return self._datos
+
+    # ---------------------------------------------------------------------
+    def _leer_indice(self):
+        try:
+            return json.loads(self.f_indice.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_indice(self):
+        self.indice.update(stat=self.stat, version=VERSION_PERFILES,
+                           hojas=self.hojas, huellas=self.huellas)
+        tmp = self.f_indice.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.indice, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.f_indice)
+
+    def _archivo(self, hoja, perfil):
+        nombre = re.sub(r"[^\w-]", "_", hoja)
+        return self.dir / f"{nombre}.{perfil}.{FORMATO}"
+
+    def _leer(self, hoja, perfil, aunque_cambie=False):
+        """Resultado guardado (con COL_HUELLA); aunque_cambie → también el de
+        una versión anterior de la hoja (para aplicar_perfil)."""
+        if MEMORIA is not None:
+            huella, df = MEMORIA.get((str(self.src), hoja, perfil), (None, None))
+            if df is not None and (huella == self.huellas.get(hoja) or aunque_cambie):
+                return df.copy()
+        ent = self.indice.get("entradas", {}).get(f"{hoja}|{perfil}")
+        if not ent or ent.get("formato") != FORMATO:
+            return None
+        if ent.get("huella") != self.huellas.get(hoja) and not aunque_cambie:
+            return None
+        try:
+            f = self._archivo(hoja, perfil)
+            if FORMATO == "parquet":
+                df = _de_columnar(pd.read_parquet(f))
+            else:
+                df = pd.read_pickle(f)
+        except Exception:
+            return None                   # caché dañada → se regenera
+        self._recordar(hoja, perfil, ent["huella"], df)
+        return df
+
+    def _recordar(self, hoja, perfil, huella, df):
+        if MEMORIA is not None:
+            MEMORIA[str(self.src), hoja, perfil] = (huella, df.copy())
+
+    def _escribir(self, hoja, perfil, df):
+        f = self._archivo(hoja, perfil)
+        if FORMATO == "parquet":
+            _a_columnar(df).to_parquet(f)
+        else:
+            df.to_pickle(f)
+        self.indice.setdefault("entradas", {})[f"{hoja}|{perfil}"] = {
+            "huella": self.huellas[hoja], "formato": FORMATO,
+        }
+
+    # ---------------------------------------------------------------------
+    def _comprobar(self, peticiones):
+        peticiones = list(dict.fromkeys(peticiones))
+        for hoja, _ in peticiones:
+            if hoja not in self.hojas:
+                raise ValueError(f"No existe la hoja «{hoja}» en {self.src.name}")
+        return peticiones
+
+    def en_segundo_plano(self, peticiones, con_huellas=False) -> Future:
+        """
+        Igual que cargar(), pero en un hilo aparte y sin mensajes: devuelve un
+        Future cuyo .result() son los frames. Las peticiones se atienden de una
+        en una y en el orden en que llegan (la caché no admite dos a la vez).
+        Una hoja inexistente falla aquí mismo, no al pedir el resultado.
+        """
+        peticiones = self._comprobar(peticiones)
+        if self._hilo is None:
+            self._hilo = ThreadPoolExecutor(1, thread_name_prefix="precarga")
+        return self._hilo.submit(self.cargar, peticiones, avisar=False, con_huellas=con_huellas)
+
+    def cerrar(self):
+        """Espera a las cargas en segundo plano pendientes y libera su hilo."""
+        if self._hilo is not None:
+            self._hilo.shutdown(wait=True)
+            self._hilo = None
+
+    def cargar(self, peticiones, avisar=True, con_huellas=False) -> dict[tuple[str, str], pd.DataFrame]:
+        """
+        peticiones: lista de (hoja, perfil). Lee del Excel solo lo que falte.
+        con_huellas: deja la huella de cada fila en la columna COL_HUELLA.
+        """
+        peticiones = self._comprobar(peticiones)
+
+        frames = {p: self._leer(*p) for p in peticiones}
+        faltan = [p for p, df in frames.items() if df is None]
+        if faltan:
+            hojas = list(dict.fromkeys(h for h, _ in faltan))
+            datos    = self.contenido()
+            self._comprobar(faltan)           # por si el libro cambió entre medias
+            procesos = n_procesos(io.BytesIO(datos), hojas)
+            if avisar:
+                print("⏳ Leyendo del Excel:", ", ".join(hojas)
+                      + (f" ({procesos} procesos)" if procesos > 1 else ""))
+            if procesos > 1:
+                previos = {p: self._leer(*p, aunque_cambie=True) for p in faltan}
+                frames.update(leer_en_paralelo(datos, faltan, procesos, previos))
+            else:
+                libro = LibroAltas(self.src, hojas, con_tramitacion=False, columnas=COLS_USADAS,
+                                   datos=datos)
+                for hoja, perfil in faltan:
+                    frames[hoja, perfil] = aplicar_perfil(perfil, libro.hoja(hoja),
+                                                          self._leer(hoja, perfil, aunque_cambie=True))
+            for hoja, perfil in faltan:
+                self._recordar(hoja, perfil, self.huellas[hoja], frames[hoja, perfil])
+
+            try:
+                self.dir.mkdir(exist_ok=True)
+                for hoja, perfil in faltan:
+                    self._escribir(hoja, perfil, frames[hoja, perfil])
+                self._guardar_indice()
+            except OSError as e:              # OneDrive bloqueando, disco lleno…
+                print(f"⚠️ No se pudo guardar la caché ({e}); se sigue sin ella.")
+        elif self.indice.get("stat") != self.stat:
+            try:
+                self._guardar_indice()
+            except OSError:
+                pass
+        if not con_huellas:
+            frames = {p: df.drop(columns=COL_HUELLA, errors="ignore") for p, df in frames.items()}
+        return frames
+
+    @property
+    def hojas_tram(self):
+        """TRAMITACION y sus 2 hojas siguientes (mismo criterio que LibroAltas)."""
+        return hojas_tramitacion(self.hojas)
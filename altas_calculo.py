@@ -0,0 +1,535 @@
+# -*- coding: utf-8 -*-
+"""
+altas_calculo.py
+----------------
+Cálculo de ALTAS / BAJAS / INCIDENCIAS y de las tablas TOTAL_GLOBAL y
+POR_COLABORADOR del check por FECHA FIRMA.
+
+Se separa en dos pasos para poder evaluar muchos periodos con una sola carga:
+
+    datos = preparar(frames, SHEETS, tram_ss)     # una vez: merge + fechas
+    res   = calcular_periodo(datos, d_ini, d_fin) # por cada (d_ini, d_fin)
+
+preparar() deja las columnas de fecha ordenadas en índices (IndiceFechas), de
+modo que cada periodo se resuelve con searchsorted en lugar de recorrer todas
+las filas con between().
+
+Forma compacta: los textos repetidos (colaborador, plan, comunidad…) quedan
+como categorías, las claves de duplicados como hashes (altas_duplicados.py)
+y las marcas por fila en matrices numpy. ALTAS, BAJAS, INCID, SEC_PLAN… de cada periodo son arrays
+de posiciones dentro de datos.raw, no copias del DataFrame:
+
+    tabla(res, "ALTAS")                           # DataFrame, solo si hace falta
+
+TOTAL_GLOBAL y POR_COLABORADOR son sumas de rasgos por fila (rasgos()); el
+cubo de altas_cubo.py acumula esos mismos rasgos por fecha.
+"""
+from __future__ import annotations
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from altas_duplicados import combina, exactos, filas_unicas, hashes_columnas, resolver
+from altas_duplicados import informe as informe_duplicados
+from altas_normaliza import TEXTO, fecha_excel, por_valor
+from altas_taxonomia import Taxonomia, patron_tokens
+
+PLANES = ["2,0 TD_1", "2,0 TD_2", "2,0 TD_3", "3,0 TD", "GAS"]
+SERVS     = {"PIH":["PIH"], "PEH+":["PEH+"], "UUEEn/UUEE":["UUEEN","UUEE"], "PTG":["PTG"]}
+#OFERTA    = "EXCLUSIVO 10% TF/TV"
+
+COLS_CAIDA = ["CAIDAS_E_Y_G", "CAIDAS_P&S"]
+
+# Texto con pocos valores distintos repetido en miles de filas → categoría
+# (y cualquier otra columna de texto en la que al menos la mitad se repite)
+COLS_CATEGORIA = ["COLABORADOR", "PLAN", "COMUNIDAD", "CODIGO COMERCIAL", "SERVICIOS",
+                  "OFERTA PRESENTADA", "PUNTO ATENCION", "FECHA ALTA ORIGINAL"]
+
+# Códigos comerciales por ubicación
+
+#MIERES
+M_CODE = ["YB19010-ANA-3188168", "YB99670-ADRIAN-155292"]
+#LENA
+L_CODE = ["YB33990-ELI-3189791"]
+#PYMES
+P_CODE = ["YA8541- GERAR- 3184474"]
+
+# Clasificación de filas del informe por colaborador (por prioridad de color)
+CLASES_TRAM = ["CAIDA FECHA PASADA", "INCIDENCIA", "BAJA", "ALTA"]
+
+ORDEN_TOTAL = [
+    "2,0 TD_1", "2,0 TD_2", "2,0 TD_3", "3,0 TD", "GAS",
+    "TOTAL",
+    "PIH", "PEH+", "UUEEn/UUEE", "PTG", "ALTAS CON INCIDENCIA"
+]
+
+
+# -------------- MARCADORES DE TEXTO (SERVS / OFERTA) -------------------------
+# (patron_tokens: ver altas_taxonomia.py)
+def contains(series: pd.Series, toks: list[str]):
+    return series.str.contains(patron_tokens(tuple(toks)), na=False, regex=True)
+
+# columnas con las marcas de SERVS que añade preparar()
+COL_SRV = {k: f"_SRV {k}" for k in SERVS}
+
+def marcar_servicios(df, tax: Taxonomia, grupos=SERVS):
+    """Código de servicios por fila (_SRV_BITS) y, a partir de él, «_SRV k»."""
+    bits = tax.bits_servicio(df["SERVICIOS"])
+    df["_SRV_BITS"] = bits
+    for k in grupos:
+        df[f"_SRV {k}"] = (bits & tax.bit_servicio(k)) != 0
+    return df
+
+# -------------- HELPERS -----------------------------------------------------
+
+def _plan_invalido(v):
+    return isinstance(v, str) and v.upper() in ("BJ", "OTROS")
+
+def _con_servicio(v):
+    return pd.notna(v) and not (isinstance(v, str) and v.upper().strip() == "NO")
+
+def valida_para_alta(df) -> pd.Series:
+    """Descarta planes BJ/OTROS salvo que tengan servicio (por valor distinto)."""
+    return ~por_valor(df["PLAN"], _plan_invalido, bool) | por_valor(df["SERVICIOS"], _con_servicio, bool)
+
+def is_mieres(df):
+    return df["CODIGO COMERCIAL"].isin(M_CODE)
+
+def is_lena(df):
+    return df["CODIGO COMERCIAL"].isin(L_CODE)
+
+def is_pymes(df):
+    return df["CODIGO COMERCIAL"].isin(P_CODE) & df["PLAN"].isin(["2,0 TD_3", "3,0 TD"])
+
+
+# ─── Etiquetas por fila para TOTAL_GLOBAL (las pone preparar()) ───────────
+COL_PLAN    = {p: f"_PLAN {p}" for p in PLANES}
+COLS_MEDIDA = ["_NO_AST", "_LENA", "_MIERES", "_PYMES"]
+
+def marcar_filas(df, planes=PLANES, tax: Taxonomia | None = None):
+    """Etiqueta cada fila una sola vez: plan (código por prefijo, _PLAN_COD, y
+    una marca por plan del informe), sede y fuera de Asturias."""
+    tax = tax or Taxonomia(planes, {})
+    df["_PLAN_COD"] = tax.codigos_plan(df["PLAN"])
+    # las marcas del informe, cada plan por separado (str.startswith): el
+    # código se queda con el plan más largo, que puede ser uno de FORMULAS
+    marcas = tax.marcas_plan(df["PLAN"], planes)
+    for j, p in enumerate(planes):
+        df[f"_PLAN {p}"] = marcas[:, j]
+    df["_NO_AST"] = df["COMUNIDAD"] != "ASTURIAS"
+    df["_LENA"]   = is_lena(df)
+    df["_MIERES"] = is_mieres(df)
+    df["_PYMES"]  = is_pymes(df)
+    return df
+
+def contar(df, categorias=None) -> np.ndarray:
+    """
+    Matriz categorías × [filas, NO_AST, LENA, MIERES, PYMES] con un único
+    producto matricial sobre las etiquetas de marcar_filas().
+    categorias=None → una sola categoría con todas las filas.
+    """
+    medidas = np.column_stack([np.ones(len(df), dtype=np.int64),
+                               df[COLS_MEDIDA].to_numpy(dtype=np.int64)])
+    if categorias is None:
+        return medidas.sum(axis=0, keepdims=True)
+    return df[categorias].to_numpy(dtype=np.int64).T @ medidas
+
+
+# ─── Rasgos por fila: las cifras del periodo son sumas de estos vectores ───
+# Por eso se pueden acumular por día (altas_cubo.py) y sumar por trozos.
+#   «A» ALTAS         planes × medidas, servicios × medidas
+#                     por colaborador: plan exacto, servicios, filas
+#   «I» INCID         medidas
+#   «B» BAJAS         planes × medidas, servicios × medidas (solo P&S)
+#                     por colaborador: plan exacto y filas (E&G con plan de
+#                     PLANES), servicios y filas (P&S)
+#   «S» BAJAS con FECHA FIRMA < d_ini (CAIDAS_FECHA_PASADA)
+#                     planes × medidas (E&G), servicios × medidas (P&S)
+TIPOS = "AIBS"
+
+def rasgos(datos, tipo, pos):
+    """(rasgos de TOTAL_GLOBAL, rasgos por colaborador o None) de las filas «pos»."""
+    n, med = len(pos), datos.medidas[pos]
+    if tipo == "I":
+        return med, None
+    cp, cs = datos.cat_plan[pos], datos.cat_srv[pos]
+    plan = (cp[:, :, None] * med[:, None, :]).reshape(n, cp.shape[1] * med.shape[1])
+    srv  = (cs[:, :, None] * med[:, None, :]).reshape(n, cs.shape[1] * med.shape[1])
+    if tipo == "A":
+        return np.hstack([plan, srv]), np.column_stack([datos.plan_exacto[pos], cs, np.ones(n, bool)])
+    eg, ps = datos.con_eg[pos, None], datos.con_ps[pos, None]
+    if tipo == "S":
+        return np.hstack([plan * eg, srv * ps]), None
+    pe  = datos.plan_exacto[pos]
+    egp = eg & pe.any(axis=1, keepdims=True)
+    return np.hstack([plan, srv * ps]), np.hstack([pe & egp, egp, cs & ps, ps])
+
+
+def por_codigo(cod, valores, n) -> np.ndarray:
+    """Suma de las filas de «valores» por código (0..n-1): matriz n × columnas."""
+    ok = cod >= 0                                   # sin COLABORADOR → fuera
+    cod, valores = cod[ok], valores[ok]
+    return np.column_stack([np.bincount(cod, weights=v, minlength=n)
+                            for v in valores.T]).astype(np.int64)
+
+
+def sumar(datos, tipo, pos):
+    """Suma de rasgos() de las filas «pos»: (total, colaboradores × rasgos o None)."""
+    total, col = rasgos(datos, tipo, pos)
+    if col is not None:
+        col = por_codigo(datos.colab[pos], col, len(datos.colab_nombres))
+    return total.sum(axis=0, dtype=np.int64), col
+
+
+class IndiceFechas:
+    """
+    Posiciones de las filas ordenadas por una columna de fecha (NaT al final).
+    entre(d_ini, d_fin) equivale a serie.between(d_ini, d_fin, "both") pero
+    solo hace dos búsquedas binarias.
+    """
+
+    def __init__(self, serie: pd.Series):
+        v = serie.to_numpy(dtype="datetime64[ns]")
+        self.n = len(v)
+        self.orden = np.argsort(v, kind="stable")         # NaT queda al final
+        self.valores = v[self.orden][: int((~np.isnat(v)).sum())]
+
+    def posiciones(self, d_ini, d_fin) -> np.ndarray:
+        lo = np.searchsorted(self.valores, pd.Timestamp(d_ini).to_datetime64(), "left")
+        hi = np.searchsorted(self.valores, pd.Timestamp(d_fin).to_datetime64(), "right")
+        return self.orden[lo:hi]
+
+    def entre(self, d_ini, d_fin) -> np.ndarray:
+        m = np.zeros(self.n, dtype=bool)
+        m[self.posiciones(d_ini, d_fin)] = True
+        return m
+
+
+# -------------- PREPARACIÓN (una vez por carga) -----------------------------
+def preparar(frames, hojas, tram_ss, tax: Taxonomia | None = None):
+    """
+    Une las hojas del mes (perfil «mes») con las CAIDAS de TRAMITACION y sus
+    2 siguientes (perfil «tram»), convierte fechas y precalcula todo lo que no
+    depende del periodo. tax: taxonomía del libro (altas_taxonomia); None →
+    solo PLANES y SERVS.
+    """
+    tax = tax or Taxonomia(PLANES, SERVS)
+    # cabeceras, CUPS/DNI, filas-cabecera y campos de texto ya vienen normalizados
+    raw = pd.concat([frames[s, "mes"] for s in hojas], ignore_index=True)
+
+    # ─── Anexar CAIDAS de TRAMITACION (cuentan como BAJAS CAIDAS_FECHA_PASADA) ──────
+    if tram_ss:
+        # sólo filas con fecha en CAIDAS (perfil «tram») → son las BAJAS
+        df_tram = pd.concat([frames[s, "tram"] for s in tram_ss], ignore_index=True)
+
+        # alinea columnas que falten / sobren y concatena
+        for c in raw.columns.difference(df_tram.columns):
+            df_tram[c] = pd.NA
+        for c in df_tram.columns.difference(raw.columns):
+            raw[c] = pd.NA
+
+        raw = pd.concat([raw, df_tram], ignore_index=True, sort=False)
+
+    # ─── Clones exactos (mes + TRAMITACION): una pasada con un hash por fila ───
+    raw, hashes = filas_unicas(raw)
+    raw = raw.reset_index(drop=True)
+
+    # ─── Mascara “válida” para altas/bajas: descartamos planes BJ/OTROS salvo que tengan servicio ───
+    mask_valida_para_alta = valida_para_alta(raw)
+
+    # ─── Fechas: una pasada por valor distinto (fecha real, número o texto) ───
+    # FECHA ALTA sale del texto original; su estado dice si era fecha, vacía
+    # o un texto (T/A, RECHAZADO…: estado > 0)
+    raw["FECHA ALTA"], raw["_ESTADO"] = fecha_excel(raw["FECHA ALTA ORIGINAL"], tax.estados)
+    raw["FECHA FIRMA"] = fecha_excel(raw["FECHA FIRMA"])[0]
+    for col in COLS_CAIDA:
+        if col in raw.columns:
+            raw[col] = fecha_excel(raw[col])[0]
+        else:
+            raw[col] = pd.NaT                    # sin columna → nunca hay caída
+
+    mask_no_caida = raw["CAIDAS_E_Y_G"].isna() & raw["CAIDAS_P&S"].isna()
+
+    # ── códigos de servicio y plan (PIH, PEH+… / 2,0 TD_1…): una pasada ──
+    marcar_servicios(raw, tax)
+    marcar_filas(raw, PLANES, tax)
+
+    # ── sin alta: FECHA ALTA con texto que no es fecha ───────────────────
+    mask_sin_alta = raw["_ESTADO"] >= TEXTO
+
+    # --- clave de duplicados funcionales ---------------------------------
+    if "CUPS" in raw.columns:
+        dedup_keys = ["COLABORADOR", "PLAN", "CUPS"]
+    elif "DNI/CIF" in raw.columns:
+        dedup_keys = ["COLABORADOR", "PLAN", "DNI/CIF"]
+    else:                          # último recurso
+        dedup_keys = ["COLABORADOR", "PLAN"]
+
+    # ── claves de duplicados: hash por fila (ver altas_duplicados.py) ────
+    # las columnas de fecha ya convertidas se vuelven a resumir; el resto no
+    hashes.update(hashes_columnas(raw, ["FECHA FIRMA", *COLS_CAIDA]))
+    h_clave = exactos(raw, dedup_keys, combina(hashes, dedup_keys))
+    h_alta  = exactos(raw, [*dedup_keys, "FECHA FIRMA"], combina(hashes, [*dedup_keys, "FECHA FIRMA"]))
+    h_baja  = exactos(raw, [*dedup_keys, *COLS_CAIDA],   combina(hashes, [*dedup_keys, *COLS_CAIDA]))
+
+    # ── marcas por fila en matrices (TOTAL_GLOBAL / POR_COLABORADOR) ─────
+    colab, colab_nombres = pd.factorize(raw["COLABORADOR"], sort=True)   # NaN → −1
+    medidas = np.column_stack([np.ones(len(raw), dtype=np.int64),
+                               raw[COLS_MEDIDA].to_numpy(dtype=np.int64)])
+    plan_exacto = np.column_stack([raw["PLAN"].eq(p).to_numpy() for p in PLANES])
+
+    # ── textos repetidos → categorías ────────────────────────────────────
+    for col in raw.columns[raw.dtypes == object]:
+        if col in COLS_CATEGORIA or raw[col].nunique(dropna=False) <= len(raw) // 2:
+            raw[col] = raw[col].astype("category")
+
+    return SimpleNamespace(
+        raw=raw,
+        dedup_keys=dedup_keys,
+        valida=mask_valida_para_alta.to_numpy(),
+        no_caida=mask_no_caida.to_numpy(),
+        sin_alta=mask_sin_alta.to_numpy(),
+        idx_firma=IndiceFechas(raw["FECHA FIRMA"]),
+        idx_caida_plan=IndiceFechas(raw["CAIDAS_E_Y_G"]),
+        idx_caida_serv=IndiceFechas(raw["CAIDAS_P&S"]),
+        firma=raw["FECHA FIRMA"].to_numpy(),
+        con_eg=raw["CAIDAS_E_Y_G"].notna().to_numpy(),
+        con_ps=raw["CAIDAS_P&S"].notna().to_numpy(),
+        h_clave=h_clave, h_alta=h_alta, h_baja=h_baja,
+        colab=colab, colab_nombres=colab_nombres,
+        medidas=medidas, plan_exacto=plan_exacto,
+        cat_plan=raw[list(COL_PLAN.values())].to_numpy(dtype=bool),
+        cat_srv=raw[list(COL_SRV.values())].to_numpy(dtype=bool),
+    )
+
+
+# -------------- PERIODO -----------------------------------------------------
+def calcular_periodo(datos, d_ini, d_fin, hoy=None):
+    """
+    ALTAS / BAJAS / INCID y tablas resumen de un periodo [d_ini, d_fin].
+    Las tablas del periodo son posiciones dentro de datos.raw (ver tabla()).
+    """
+    hoy = hoy if hoy is not None else pd.to_datetime(datetime.today().date())
+
+    mask_firma     = datos.idx_firma.entre(d_ini, d_fin)
+    mask_caida_any = (datos.idx_caida_plan.entre(d_ini, hoy) |
+                      datos.idx_caida_serv.entre(d_ini, hoy))
+
+    ALTAS = np.flatnonzero(mask_firma & datos.no_caida & datos.valida)
+    INCID = np.flatnonzero(mask_firma & datos.no_caida & datos.sin_alta & datos.valida)
+    BAJAS = np.flatnonzero(mask_caida_any & datos.valida)
+
+    # ---------- eliminamos duplicados en cada tabla (una pasada) ----------
+    # primera fila por COLABORADOR + PLAN + CUPS/DNI; se apunta lo eliminado
+    # y si tenía la misma fecha que la que se queda
+    ALTAS, el_altas = resolver(ALTAS, datos.h_clave, datos.h_alta)
+    BAJAS, el_bajas = resolver(BAJAS, datos.h_clave, datos.h_baja)
+    INCID, el_inci  = resolver(INCID, datos.h_clave, datos.h_alta)
+
+    #  ➜  SEPARO las caídas de contrato (E&G) y las de servicios
+    BAJAS_PLAN = BAJAS[datos.con_eg[BAJAS]]
+    BAJAS_SERV = BAJAS[datos.con_ps[BAJAS]]
+
+    #  ➜  Fechas para CAIDAS_FECHA_PASADA
+    d0  = pd.Timestamp(d_ini).to_datetime64()
+    SEC = BAJAS[datos.firma[BAJAS] < d0]
+    SEC_PLAN = SEC[datos.con_eg[SEC]]
+    SEC_SERV = SEC[datos.con_ps[SEC]]
+
+    res = SimpleNamespace(
+        datos=datos, d_ini=d_ini, d_fin=d_fin,
+        ALTAS=ALTAS, BAJAS=BAJAS, INCID=INCID,
+        BAJAS_PLAN=BAJAS_PLAN, BAJAS_SERV=BAJAS_SERV,
+        SEC_PLAN=SEC_PLAN, SEC_SERV=SEC_SERV,
+        eliminadas={"ALTAS": el_altas, "BAJAS": el_bajas, "INCID": el_inci},
+    )
+    sumas = {t: sumar(datos, t, pos) for t, pos in zip(TIPOS, (ALTAS, INCID, BAJAS, SEC))}
+    return resumir(res, sumas, datos.colab_nombres)
+
+
+def resumir(res, sumas, colab_nombres):
+    """TOTAL_GLOBAL y POR_COLABORADOR de res a partir de {tipo: sumar(...)}."""
+    res.total_global = total_global(sumas)
+    res.por_colab_t  = por_colaborador(sumas, colab_nombres)
+    return res
+
+
+def tabla(res, nombre) -> pd.DataFrame:
+    """Filas de una tabla del periodo («ALTAS», «SEC_PLAN»…) como DataFrame."""
+    return res.datos.raw.iloc[getattr(res, nombre)]
+
+
+def calcular_periodos(datos, periodos, hoy=None):
+    """Lista de (d_ini, d_fin) → lista de resultados, con una sola preparación."""
+    return [calcular_periodo(datos, d_ini, d_fin, hoy) for d_ini, d_fin in periodos]
+
+
+def guardar_duplicados(res, ruta):
+    """duplicados_en_altas_bajas.xlsx: lo eliminado en el periodo y por qué."""
+    hojas = informe_duplicados(res.datos.raw, res.eliminadas)
+    if not hojas:
+        return False
+    try:
+        with pd.ExcelWriter(ruta) as w:
+            for nombre, df in hojas.items():
+                df.to_excel(w, sheet_name=nombre, index=False)
+    except PermissionError:
+        print(f"⚠️ No puedo guardar «{ruta.name}» (¿abierto en Excel?); sigo sin él.")
+        return False
+    n = sum(len(e[0]) for e in res.eliminadas.values())
+    print(f"ℹ️  Se han eliminado {n} duplicados; detalle en {ruta.name}")
+    return True
+
+
+# -------------- TOTAL_GLOBAL ------------------------------------------------
+def _fila_total(tipo, a, b, sec):
+    """a, b, sec: salida de contar() para ALTAS, BAJAS y CAIDAS_FECHA_PASADA."""
+    a, b, sec = ([int(x) for x in v] for v in (a, b, sec))
+    # ── cifras base ───────────────────────────────────────────────
+    bajas_norm = b[0] - sec[0]             # BAJAS reales del rango
+    caidas_pas = sec[0]                    # firma < d_ini -> caída dentro
+    no_ast     = a[1]
+    return {
+        "TIPO": tipo,
+        "ALTAS":  a[0],
+        "BAJAS":  bajas_norm,
+        "CAIDAS_FECHA_PASADA": caidas_pas,
+        "NO_ASTURIAS": no_ast,
+        "TOTALES": a[0] - bajas_norm - caidas_pas - no_ast,
+
+        # ---- desglose por sede ----------------------------------
+        "ALTAS_LENA":   a[2],
+        "BAJAS_LENA":   b[2] - sec[2],
+        "ALTAS_MIERES": a[3],
+        "BAJAS_MIERES": b[3] - sec[3],
+        "ALTAS_PYMES":  a[4],
+        "BAJAS_PYMES":  b[4] - sec[4],
+    }
+
+
+def total_global(sumas):
+    """sumas: {tipo: sumar(...)} de ALTAS, INCID, BAJAS y CAIDAS_FECHA_PASADA."""
+    nm, npl = len(COLS_MEDIDA) + 1, len(PLANES)
+
+    # categorías (planes / servicios) × medidas de cada tabla
+    def partir(tipo):
+        v = sumas[tipo][0]
+        return v[:npl * nm].reshape(npl, nm), v[npl * nm:].reshape(-1, nm)
+    (a_plan, a_srv), (b_plan, b_srv), (s_plan, s_srv) = map(partir, "ABS")
+    incid = sumas["I"][0]
+
+    rows  = [_fila_total(p, *v) for p, *v in zip(PLANES, a_plan, b_plan, s_plan)]
+    rows += [_fila_total(k, *v) for k, *v in zip(SERVS, a_srv, b_srv, s_srv)]
+    rows.append(_fila_total("ALTAS CON INCIDENCIA", incid, incid, np.zeros_like(incid)))
+
+    tg = pd.DataFrame(rows)
+    # --- TOTALES BÁSICOS -----------------------------------------------
+    df_planes = tg[tg["TIPO"].isin(PLANES)]
+
+    tot = {
+        "TIPO": "TOTAL",
+        "ALTAS":               df_planes["ALTAS"].sum(),          # suma planes energía
+        "BAJAS":               df_planes["BAJAS"].sum(),
+        "CAIDAS_FECHA_PASADA": df_planes["CAIDAS_FECHA_PASADA"].sum(),
+        "NO_ASTURIAS":         df_planes["NO_ASTURIAS"].sum(),
+    }
+    tot["TOTALES"] = (
+          tot["ALTAS"]
+        - tot["BAJAS"]
+        - tot["CAIDAS_FECHA_PASADA"]
+        - tot["NO_ASTURIAS"]
+    )
+
+    # --- NETOS POR SEDE (ALTAS + INCID – BAJAS) -------------------------
+    def neto_sede(sede, i):
+        altas  = df_planes[f"ALTAS_{sede}"].sum()            # ALTAS de los 5 planes
+        bajas  = df_planes[f"BAJAS_{sede}"].sum()            # BAJAS de los 5 planes
+        return altas + int(incid[i]) - bajas                 # + altas con incidencia en esa sede
+
+    tot["ALTAS_LENA"]   = neto_sede("LENA",   2)
+    tot["ALTAS_MIERES"] = neto_sede("MIERES", 3)
+    tot["ALTAS_PYMES"]  = neto_sede("PYMES",  4)
+
+    # columnas de BAJAS_* quedan vacías (solo tienen sentido en las filas de detalle)
+    tot["BAJAS_LENA"] = tot["BAJAS_MIERES"] = tot["BAJAS_PYMES"] = ""
+
+    tg = pd.concat([tg, pd.DataFrame([tot])], ignore_index=True)
+
+    # ——— ORDENA las filas según el orden deseado ———
+    tg["TIPO"] = pd.Categorical(tg["TIPO"], categories=ORDEN_TOTAL, ordered=True)
+    return tg.sort_values("TIPO").reset_index(drop=True)
+
+
+# -------------- POR_COLAB ---------------------------------------------------
+def por_colaborador(sumas, colab_nombres):
+    """
+    PLAN_<p>_ALTA, PLAN_<p>_CAIDA, SERVICIO_<k>_ALTA y SERVICIO_<k>_CAIDA por
+    COLABORADOR a partir de los rasgos por colaborador de ALTAS y BAJAS (ver
+    rasgos()). Solo salen los colaboradores con alguna fila, en orden alfabético.
+    """
+    npl, nsv = len(PLANES), len(SERVS)
+    alt, baj = sumas["A"][1], sumas["B"][1]
+
+    # ALTAS: planes y servicios · BAJAS de PLAN (solo las de contrato) y de
+    # SERVICIOS (solo las de P&S)
+    presentes = (alt[:, -1] > 0) | (baj[:, npl] > 0) | (baj[:, -1] > 0)
+    cifras = np.hstack([alt[:, :npl], baj[:, :npl],
+                        alt[:, npl:npl + nsv], baj[:, npl + 1:npl + 1 + nsv]])
+
+    orden = ([f"PLAN_{p}_ALTA" for p in PLANES] + [f"PLAN_{p}_CAIDA" for p in PLANES] +
+             [f"SERVICIO_{k}_ALTA" for k in SERVS] + [f"SERVICIO_{k}_CAIDA" for k in SERVS])
+    por_colab = pd.DataFrame(cifras[presentes], columns=orden,
+                             index=pd.Index(np.asarray(colab_nombres)[presentes], name="COLABORADOR"))
+    # sin ninguna ALTA (o BAJA de P&S) en el periodo, las filas SERVICIO_*_ALTA
+    # (o _CAIDA) no salen, como en el groupby().apply() original
+    if not alt[:, -1].any():
+        por_colab = por_colab.drop(columns=[f"SERVICIO_{k}_ALTA" for k in SERVS])
+    if not baj[:, -1].any():
+        por_colab = por_colab.drop(columns=[f"SERVICIO_{k}_CAIDA" for k in SERVS])
+    por_colab_t = por_colab.T.reset_index()
+    por_colab_t.columns = ["INDICADOR"] + por_colab_t.columns[1:].tolist()
+    # ── FILTRA solo indicadores válidos ────────────────────────────────
+    valid = por_colab_t["INDICADOR"].str.match(r"^(PLAN_|OFERTA_|SERVICIO_)")
+    return por_colab_t[valid].reset_index(drop=True)
+
+
+# -------------- INFORME POR COLABORADOR (TRAMITACION) -----------------------
+def clasificar_tramitacion(df_tram, d_ini, d_fin, hoy=None):
+    """
+    Filas de TRAMITACION (perfil «colab») que entran en el informe por
+    colaborador, con su CLASE ya calculada (categórica, ver CLASES_TRAM).
+    Las máscaras se calculan una sola vez para todas las filas.
+    """
+    hoy = hoy if hoy is not None else pd.to_datetime(datetime.today().date())
+
+    # ─── máscaras base ────────────────────────────────────────────────────
+    mask_valida  = valida_para_alta(df_tram)
+
+    firma, c_eg, c_ps = df_tram["FECHA FIRMA"], df_tram["CAIDAS_E_Y_G"], df_tram["CAIDAS_P&S"]
+    no_caida = c_eg.isna() & c_ps.isna()
+    m_alta = firma.between(d_ini, d_fin, "both") & no_caida & mask_valida
+    m_baja = (c_eg.between(d_ini, d_fin, "both") | c_ps.between(d_ini, d_fin, "both")) & mask_valida
+    m_inci = m_alta & df_tram["FECHA ALTA"].isna()
+    m_sec  = (firma < d_ini) & (
+        c_eg.between(d_ini, hoy, "both") | c_ps.between(d_ini, hoy, "both")
+    ) & mask_valida
+
+    # mismo orden de prioridad que los colores: sec > inci > baja > alta
+    clase = np.select([m_sec, m_inci, m_baja, m_alta], CLASES_TRAM, default="")
+    sel = clase != ""
+    out = df_tram.loc[sel].copy()
+    out["CLASE"] = pd.Categorical(clase[sel], categories=CLASES_TRAM)
+    return out
+
+
+def filas_por_colaborador(df_tram, clasificado):
+    """
+    (colaborador, filas) para cada valor distinto de COLABORADOR, en orden de
+    aparición, aunque no tenga filas. Como antes, «Ana » y «ANA» comparten
+    filas (se compara sin espacios y en mayúsculas). Un único groupby.
+    """
+    clave  = por_valor(clasificado["COLABORADOR"].astype(str), lambda v: v.strip().upper())
+    grupos = dict(tuple(clasificado.groupby(clave, sort=False)))
+    vacio  = clasificado.iloc[0:0]
+    for col in df_tram["COLABORADOR"].dropna().unique():
+        yield col, grupos.get(str(col).strip().upper(), vacio)
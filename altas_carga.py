@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+altas_carga.py
+--------------
+Lectura única de 2025_TRAMITACION_DE_ALTAS.xlsx.
+
+Abre el libro una sola vez, recorre solo las hojas que necesita el informe
+(meses pedidos + TRAMITACION y sus dos hojas siguientes) y las entrega como
+DataFrames con los mismos tipos que daría pd.read_excel. Con «columnas» solo
+se leen las columnas que usa el informe, hasta la última de ellas (las hojas
+declaran rangos A1:XFD… por el formato). Cada hoja conserva además el valor
+original de FECHA ALTA en la columna «FECHA ALTA ORIGINAL», de modo que el
+texto (T/A, RECHAZO…) viaja con su fila aunque luego se filtre o se concatene.
+
+Motor de lectura: python-calamine (compilado, en Rust) si está instalado;
+si no, openpyxl en modo read_only. Los dos entregan exactamente las mismas
+celdas (fecha real → datetime, texto → str), así que en FECHA ALTA se sigue
+distinguiendo la fecha del texto «T/A», «RECHAZO»… Para forzar uno:
+variable de entorno ALTAS_MOTOR=openpyxl (o calamine).
+
+El libro vive en una carpeta de OneDrive: se lee entero a memoria una sola vez
+(leer_estable) y todos los lectores trabajan sobre esa copia.
+"""
+from __future__ import annotations
+import io, os, time, unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+from pathlib import Path
+import pandas as pd
+from pandas.io.parsers import TextParser
+from openpyxl import load_workbook
+
+try:
+    import python_calamine
+except ImportError:                    # sin calamine → openpyxl
+    python_calamine = None
+
+HOJA_TRAM    = "TRAMITACION"
+N_SIGUIENTES = 2                       # TRAMITACION + 2 hojas siguientes
+COL_ORIGINAL = {"FECHA ALTA": "FECHA ALTA ORIGINAL"}
+
+
+@lru_cache(maxsize=4096)                # cabeceras y textos repetidos hoja tras hoja
+def sin_tildes(txt):
+    return "".join(c for c in unicodedata.normalize("NFKD", txt)
+                   if not unicodedata.combining(c))
+
+
+def hojas_tramitacion(hojas):
+    """TRAMITACION y las N_SIGUIENTES hojas que la siguen en el libro."""
+    if HOJA_TRAM not in hojas:
+        return []
+    i_tram = hojas.index(HOJA_TRAM)
+    return list(hojas[i_tram : i_tram + 1 + N_SIGUIENTES])
+
+
+def _celda(v):
+    """Mismo criterio que el lector openpyxl de pandas."""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    if type(v) is date:                # calamine: fecha sin hora → date
+        return datetime(v.year, v.month, v.day)
+    return v
+
+
+# -------------- COPIA EN MEMORIA ---------------------------------------------
+def leer_estable(src, intentos=5, espera=1.0):
+    """
+    Lee el fichero entero de una vez y comprueba que no ha cambiado mientras se
+    leía (tamaño y fecha antes y después). Si OneDrive lo está sincronizando o
+    lo tiene bloqueado, espera y lo vuelve a intentar.
+    Devuelve (bytes, os.stat_result de la versión leída).
+    """
+    src = Path(src)
+    for i in range(intentos):
+        try:
+            antes = src.stat()
+            datos = src.read_bytes()
+            despues = src.stat()
+        except PermissionError:
+            pass                           # bloqueado por el cliente de sincronización
+        else:
+            if (antes.st_size, antes.st_mtime_ns) == (despues.st_size, despues.st_mtime_ns) \
+                    and len(datos) == despues.st_size:
+                return datos, despues
+        if i < intentos - 1:
+            print(f"⚠️ «{src.name}» está cambiando o bloqueado; reintento en {espera:g} s …")
+            time.sleep(espera)
+    raise OSError(f"No se pudo leer «{src.name}» sin que cambiase (¿OneDrive sincronizando?)")
+
+
+# -------------- MOTORES DE LECTURA ------------------------------------------
+class _LectorOpenpyxl:
+    nombre = "openpyxl"
+
+    def __init__(self, src):
+        self.wb = load_workbook(src, read_only=True, data_only=True)
+        self.hojas = list(self.wb.sheetnames)
+
+    def filas(self, hoja, max_col=None):
+        ws = self.wb[hoja]
+        ws.reset_dimensions()              # ignora el rango declarado (A1:XFD…)
+        return ws.iter_rows(max_col=max_col, values_only=True)
+
+    def cerrar(self):
+        # evita el bloqueo en Windows
+        self.wb.close()
+
+
+class _LectorCalamine:
+    nombre = "calamine"
+
+    def __init__(self, src):
+        if isinstance(src, io.BytesIO):
+            self.wb = python_calamine.CalamineWorkbook.from_filelike(src)
+        else:
+            self.wb = python_calamine.CalamineWorkbook.from_path(str(src))
+        self.hojas = list(self.wb.sheet_names)
+
+    def filas(self, hoja, max_col=None):
+        # skip_empty_area=False → la fila 1 es siempre la cabecera; el rango
+        # lo acota calamine a las celdas con valor, max_col no hace falta
+        return iter(self.wb.get_sheet_by_name(hoja).to_python(skip_empty_area=False))
+
+    def cerrar(self):
+        self.wb.close()
+
+
+MOTORES = {"calamine": _LectorCalamine, "openpyxl": _LectorOpenpyxl}
+
+
+def motor_por_defecto() -> str:
+    pedido = os.environ.get("ALTAS_MOTOR", "").strip().lower()
+    if pedido in MOTORES:
+        return pedido
+    return "calamine" if python_calamine is not None else "openpyxl"
+
+
+def abrir_libro(src, motor=None, datos=None):
+    """Abre el libro con el motor pedido (o el mejor disponible). Con «datos»
+    (contenido ya leído de src) no se toca el disco."""
+    nombre = Path(src).name
+    if datos is not None:
+        src = io.BytesIO(datos)
+    motor = motor or motor_por_defecto()
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconocido «{motor}» (opciones: {', '.join(MOTORES)})")
+    if motor == "calamine":
+        if python_calamine is None:
+            raise ValueError("El motor calamine necesita «pip install python-calamine»")
+        try:
+            return _LectorCalamine(src)
+        except python_calamine.CalamineError as e:
+            print(f"⚠️ calamine no puede abrir «{nombre}» ({e}) → openpyxl")
+            if datos is not None:
+                src.seek(0)
+    return _LectorOpenpyxl(src)
+
+
+def norm_cabecera(c) -> str:
+    """Mismo criterio que altas_normaliza.normaliza_cabeceras()."""
+    return sin_tildes(str(c)).upper().strip()
+
+
+def _filas_proyectadas(lector, hoja, columnas):
+    """
+    Recorre la hoja leyendo solo las columnas cuya cabecera (normalizada)
+    está en «columnas», y nunca más allá de la última de ellas: el rango
+    declarado (A1:XFD…) y las celdas con formato pero sin datos no se tocan.
+    Devuelve (cabecera completa, filas proyectadas con su cabecera).
+    """
+    cab = next(lector.filas(hoja, max_col=None), None)
+    if cab is None:
+        return [], []
+    completa = [v for v in cab if v not in (None, "")]
+    idx = [i for i, v in enumerate(cab)
+           if v not in (None, "") and norm_cabecera(v) in columnas]
+    if not idx:
+        return completa, []
+    ancho = idx[-1] + 1
+    filas = [[cab[i] for i in idx]]
+    resto = lector.filas(hoja, max_col=ancho)
+    next(resto, None)                      # cabecera
+    for fila in resto:
+        filas.append([fila[i] if i < len(fila) else None for i in idx])
+    return completa, filas
+
+
+def _a_dataframe(filas) -> pd.DataFrame:
+    """Convierte las filas de una hoja en DataFrame (cabecera en la fila 1)."""
+    datos, ultima = [], 0
+    for fila in filas:
+        fila = [_celda(v) for v in fila]
+        while fila and fila[-1] == "":
+            fila.pop()
+        if fila:
+            ultima = len(datos) + 1
+        datos.append(fila)
+    datos = datos[:ultima]
+    if not datos:
+        return pd.DataFrame()
+
+    ancho = max(len(f) for f in datos)
+    datos = [f + [""] * (ancho - len(f)) for f in datos]
+    df = TextParser(datos, header=0).read()
+
+    # ─── copia intacta de las columnas cuyo texto se necesita después ────────
+    for col in list(df.columns):
+        destino = COL_ORIGINAL.get(norm_cabecera(col))
+        if destino and destino not in df.columns:
+            df[destino] = df[col]
+    return df
+
+
+class LibroAltas:
+    """
+    Carga en una sola pasada las hojas indicadas del libro de altas.
+
+    >>> libro = LibroAltas(SRC_XLS, ["MAYO"])
+    >>> raw   = libro.concat(["MAYO"])
+    >>> tram  = libro.concat(libro.hojas_tram)
+    """
+
+    def __init__(self, src, hojas=(), con_tramitacion=True, columnas=None, motor=None,
+                 datos=None):
+        """
+        columnas: cabeceras (normalizadas) a leer; None → todas. Con lista, la
+        cabecera completa de cada hoja queda en df.attrs["cabecera"].
+        motor: "calamine" u "openpyxl"; None → motor_por_defecto().
+        datos: contenido de src ya leído (leer_estable); None → se lee de disco.
+        """
+        self.src = Path(src)
+        lector = abrir_libro(self.src, motor, datos)
+        self.motor = lector.nombre
+        try:
+            self.hojas = lector.hojas
+            self.hojas_tram = hojas_tramitacion(self.hojas) if con_tramitacion else []
+
+            pedidas = list(dict.fromkeys([*hojas, *self.hojas_tram]))
+            for h in pedidas:
+                if h not in self.hojas:
+                    raise ValueError(f"No existe la hoja «{h}» en {self.src.name}")
+
+            self._frames = {}
+            for h in pedidas:
+                if columnas is None:
+                    self._frames[h] = _a_dataframe(lector.filas(h))
+                else:
+                    cabecera, filas = _filas_proyectadas(lector, h, set(columnas))
+                    self._frames[h] = _a_dataframe(filas)
+                    self._frames[h].attrs["cabecera"] = cabecera
+        finally:
+            lector.cerrar()
+
+    def hoja(self, nombre) -> pd.DataFrame:
+        """Copia de la hoja (se puede modificar sin afectar a las demás etapas)."""
+        return self._frames[nombre].copy()
+
+    def concat(self, nombres) -> pd.DataFrame:
+        nombres = list(nombres)
+        if not nombres:
+            return pd.DataFrame()
+        return pd.concat([self.hoja(n) for n in nombres], ignore_index=True)
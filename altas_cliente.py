@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+altas_cliente.py
+----------------
+Cliente ligero del servidor residente (altas_servidor.py): es lo que llaman
+los .bat. Solo usa la librería estándar, así que arranca al momento.
+
+    python altas_cliente.py "RUTA\\checks_altasFILTRO_FIRMA_OFICI.py" 01-05-2025 31-05-2025
+
+Si el servidor está en marcha, el script se ejecuta allí (con el libro ya en
+memoria) y aquí solo se ven sus mensajes y se contestan sus preguntas. Si no
+lo está, se ejecuta el script aquí mismo, como antes.
+"""
+from __future__ import annotations
+import codecs, json, os, socket, subprocess, sys, threading
+
+PUERTO = int(os.environ.get("ALTAS_PUERTO", 47011))
+FIN    = "\x00"                          # igual que en altas_servidor.py
+
+
+def _reenviar_entrada(sock):
+    """Lo que se teclee aquí es la entrada estándar del script remoto."""
+    try:
+        for linea in sys.stdin:
+            sock.sendall(linea.encode("utf-8"))
+    except OSError:
+        pass
+
+
+def por_servidor(script, args) -> int | None:
+    """Código de salida del script ejecutado en el servidor; None si no hay servidor."""
+    try:
+        sock = socket.create_connection(("127.0.0.1", PUERTO), timeout=1)
+    except OSError:
+        return None
+    with sock:
+        sock.settimeout(None)
+        pet = {"script": os.path.basename(script), "args": args, "cwd": os.getcwd()}
+        sock.sendall(json.dumps(pet).encode("utf-8") + b"\n")
+        threading.Thread(target=_reenviar_entrada, args=(sock,), daemon=True).start()
+
+        # la salida se muestra según llega; tras FIN solo queda el código
+        texto, dec = "", codecs.getincrementaldecoder("utf-8")("replace")
+        while trozo := sock.recv(65536):
+            texto += dec.decode(trozo)
+            if FIN not in texto:
+                sys.stdout.write(texto)
+                sys.stdout.flush()
+                texto = ""
+    resto, _, codigo = texto.partition(FIN)
+    sys.stdout.write(resto)
+    sys.stdout.flush()
+    try:
+        return int(codigo.strip())
+    except ValueError:
+        print("❌ El servidor cortó la conexión sin terminar.")
+        return 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        sys.exit("Uso: altas_cliente.py SCRIPT [argumentos…]")
+    script, args = argv[0], argv[1:]
+    codigo = por_servidor(script, args)
+    if codigo is None:                    # sin servidor → como siempre
+        codigo = subprocess.call([sys.executable, script, *args])
+    sys.exit(codigo)
+
+
+if __name__ == "__main__":
+    main()
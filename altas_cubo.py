@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+"""
+altas_cubo.py
+-------------
+Cubo fecha × rasgo con sumas acumuladas: TOTAL_GLOBAL y POR_COLABORADOR de
+cualquier periodo sin volver a recorrer las filas.
+
+Todas las cifras son sumas de rasgos por fila (altas_calculo.rasgos). Cada
+fila se apunta una vez en la casilla de su fecha (medio día: a las 0 h o más
+tarde, para respetar between() con fechas a medianoche) y se guardan las sumas
+acumuladas, así que un periodo [d_ini, d_fin] son dos consultas por tipo:
+
+    ALTAS / INCID          por FECHA FIRMA          P[d_fin] − P[d_ini)
+    BAJAS                  por la última CAIDA      total − P[d_ini)
+    CAIDAS_FECHA_PASADA    FECHA FIRMA < d_ini ≤ última CAIDA
+                           (acumulado de +1 tras la firma y −1 tras la caída)
+
+Lo que no se puede sumar así va aparte, fila a fila, y se resuelve en cada
+consulta igual que calcular_periodo():
+  · claves con más de una fila candidata (duplicados: la que se queda depende
+    del periodo);
+  · fechas fuera del rango habitual del libro (años mal tecleados), para que
+    el cubo no crezca sin límite;
+  · CAIDAS posteriores al día en que se construye.
+
+Se guarda en «<libro>.cache/cubo_<clave>.npz». La clave resume las huellas
+de las hojas usadas, la taxonomía y los códigos del informe: solo se rehace
+si cambia alguna de esas hojas, y entonces las que no han cambiado salen de
+la caché de altas_cache.py.
+
+    cubo = Cubo.cargar(ruta) or Cubo.construir(datos)
+    res  = cubo.periodo(d_ini, d_fin)      # None → calcular_periodo()
+"""
+from __future__ import annotations
+import hashlib, json, os
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import altas_calculo as calc
+from altas_calculo import TIPOS, por_codigo, rasgos, resumir
+from altas_duplicados import resolver
+from altas_normaliza import VERSION_PERFILES
+
+VERSION_CUBO    = 2                      # 2: marcas de plan por str.startswith
+CUBOS_GUARDADOS = 8                      # en la caché quedan los más recientes
+RANGO           = (0.001, 0.999)         # cuantiles de fechas que cubre el cubo
+NAT             = np.iinfo(np.int64).min # casilla de una fecha vacía
+
+
+def casilla(fechas) -> np.ndarray:
+    """Medio día de cada fecha: 2·día a las 0 h, 2·día + 1 más tarde; NaT → NAT."""
+    v   = np.asarray(fechas, dtype="datetime64[ns]")
+    dia = v.astype("datetime64[D]")
+    c   = 2 * dia.astype(np.int64) + (v != dia)
+    return np.where(np.isnat(v), NAT, c)
+
+
+def _a_medianoche(fecha):
+    """Casilla de una fecha a las 0 h (None si tiene hora)."""
+    c = int(casilla([pd.Timestamp(fecha)])[0])
+    return None if c % 2 else c
+
+
+def _repetidas(h, m) -> np.ndarray:
+    """Filas de «m» cuya clave h aparece más de una vez entre las de «m»."""
+    _, inv, n = np.unique(h[m], return_inverse=True, return_counts=True)
+    r = np.zeros(len(h), dtype=bool)
+    r[np.flatnonzero(m)] = n[inv.ravel()] > 1
+    return r
+
+
+def ruta_cubo(cache, hojas, tram_ss, tax, huellas=None) -> Path:
+    """
+    Archivo del cubo para estas hojas en la caché de «cache» (CacheAltas).
+    huellas: {hoja: huella} si las filas no salen del libro (altas_bd).
+    """
+    huellas = huellas if huellas is not None else (cache.huellas or {})
+    partes = [VERSION_CUBO, VERSION_PERFILES, list(hojas), list(tram_ss),
+              [huellas.get(h) for h in [*hojas, *tram_ss]], tax.a_dict(),
+              calc.PLANES, calc.SERVS, calc.M_CODE, calc.L_CODE, calc.P_CODE]
+    clave = hashlib.sha1(json.dumps(partes, ensure_ascii=False).encode()).hexdigest()
+    return cache.dir / f"cubo_{clave[:16]}.npz"
+
+
+class Cubo:
+    """
+    Sumas acumuladas por casilla de cada tipo de altas_calculo.TIPOS (P_*),
+    las filas que se resuelven aparte (E_*) y los colaboradores.
+    """
+
+    def __init__(self, arrays: dict):
+        self.a = arrays
+        self.lo, self.nb = int(arrays["lo"]), int(arrays["nb"])
+        self.caida_max   = int(arrays["caida_max"])
+        self.colab_nombres = arrays["colab_nombres"]
+
+    # ---------------------------------------------------------------------
+    @classmethod
+    def construir(cls, datos, hoy=None) -> "Cubo":
+        """Cubo de la salida de altas_calculo.preparar()."""
+        hoy = casilla([hoy if hoy is not None else pd.Timestamp(datetime.today().date())])[0]
+        fb = casilla(datos.firma)
+        eb = casilla(datos.raw["CAIDAS_E_Y_G"])
+        pb = casilla(datos.raw["CAIDAS_P&S"])
+        cb = np.maximum(eb, pb)                          # última CAIDA (NAT es el mínimo)
+
+        pot_a = datos.valida & datos.no_caida & (fb != NAT)   # puede ser ALTA / INCID
+        pot_b = datos.valida & (cb != NAT)                    # puede ser BAJA
+
+        # ─── rango del cubo: días completos entre los cuantiles de las fechas ───
+        fechas = np.concatenate([c[c != NAT] for c in (fb, eb, pb)])
+        if len(fechas):
+            lo = int(np.quantile(fechas, RANGO[0], method="lower")) // 2 * 2
+            hi = int(np.quantile(fechas, RANGO[1], method="higher")) | 1
+        else:
+            lo, hi = 0, 1
+        nb = hi - lo + 1
+
+        def fuera(c):
+            return (c != NAT) & ((c < lo) | (c > hi))
+
+        aparte_a = pot_a & (_repetidas(datos.h_clave, pot_a) | fuera(fb))
+        aparte_b = pot_b & (_repetidas(datos.h_clave, pot_b) | fuera(fb) | fuera(eb) |
+                            fuera(pb) | (cb > hoy))
+        n_col = len(datos.colab_nombres)
+        arrays = dict(lo=lo, nb=nb, colab_nombres=np.asarray(datos.colab_nombres, dtype=str))
+
+        # ─── sumas acumuladas por casilla ────────────────────────────────
+        def acumular(tipo, m, c):
+            pos = np.flatnonzero(m)
+            total, col = rasgos(datos, tipo, pos)
+            b = c[pos] - lo
+            arrays[f"P_{tipo}"] = _acumulada(por_codigo(b, total, nb))
+            if col is not None:
+                cod = np.where(datos.colab[pos] >= 0, b * n_col + datos.colab[pos], -1)
+                arrays[f"PC_{tipo}"] = _acumulada(por_codigo(cod, col, nb * n_col)
+                                                  .reshape(nb, n_col, -1))
+
+        en_a, en_b = pot_a & ~aparte_a, pot_b & ~aparte_b
+        acumular("A", en_a, fb)
+        acumular("I", en_a & datos.sin_alta, fb)
+        acumular("B", en_b, cb)
+
+        # CAIDAS_FECHA_PASADA: cuenta en d_ini si firma < d_ini ≤ última CAIDA
+        pos = np.flatnonzero(en_b & (fb != NAT) & (fb < cb))
+        total, _ = rasgos(datos, "S", pos)
+        entra = por_codigo(fb[pos] + 1 - lo, total, nb + 1)
+        sale  = por_codigo(cb[pos] + 1 - lo, total, nb + 1)
+        arrays["P_S"] = np.cumsum(entra - sale, axis=0, dtype=np.int32)
+        arrays["caida_max"] = cb[en_b].max() if en_b.any() else NAT
+
+        # ─── filas que se resuelven en cada consulta ─────────────────────
+        e = np.flatnonzero(aparte_a | aparte_b)
+        arrays.update(E_a=aparte_a[e], E_b=aparte_b[e], E_sin=datos.sin_alta[e],
+                      E_clave=datos.h_clave[e], E_colab=datos.colab[e],
+                      E_fb=fb[e], E_eb=eb[e], E_pb=pb[e])
+        for tipo in TIPOS:
+            total, col = rasgos(datos, tipo, e)
+            arrays[f"E_{tipo}"] = total
+            if col is not None:
+                arrays[f"EC_{tipo}"] = col
+        return cls(arrays)
+
+    # ---------------------------------------------------------------------
+    def periodo(self, d_ini, d_fin, hoy=None):
+        """
+        Como calcular_periodo(): res con d_ini, d_fin, total_global y
+        por_colab_t (sin las tablas de filas). None si el cubo no sirve para
+        ese periodo (fechas con hora, o «hoy» anterior a alguna CAIDA).
+        """
+        hoy = hoy if hoy is not None else pd.Timestamp(datetime.today().date())
+        c_ini, c_fin, c_hoy = (_a_medianoche(f) for f in (d_ini, d_fin, hoy))
+        if c_ini is None or c_fin is None or c_hoy is None or c_hoy < self.caida_max:
+            return None
+
+        a, nb = self.a, self.nb
+        i   = min(max(c_ini - self.lo, 0), nb)
+        f   = min(max(c_fin + 1 - self.lo, 0), nb)
+        s   = c_ini - self.lo
+        rangos = {"A": (i, f), "I": (i, f), "B": (i, nb)}
+
+        sumas = {}
+        for tipo, (ini, fin) in rangos.items():
+            col = a[f"PC_{tipo}"][fin] - a[f"PC_{tipo}"][ini] if f"PC_{tipo}" in a else None
+            sumas[tipo] = (a[f"P_{tipo}"][fin] - a[f"P_{tipo}"][ini], col)
+        sumas["S"] = (a["P_S"][s] if 0 <= s <= nb else np.zeros_like(a["P_S"][0]), None)
+
+        for tipo, (total, col) in self._aparte(c_ini, c_fin, c_hoy).items():
+            t0, c0 = sumas[tipo]
+            sumas[tipo] = (t0 + total, None if col is None else c0 + col)
+
+        res = SimpleNamespace(d_ini=d_ini, d_fin=d_fin)
+        return resumir(res, sumas, self.colab_nombres)
+
+    def _aparte(self, c_ini, c_fin, c_hoy):
+        """Sumas de las filas E_* en el periodo, con duplicados como resolver()."""
+        a = self.a
+        fb, clave = a["E_fb"], a["E_clave"]
+
+        def cae(c):
+            return (c >= c_ini) & (c <= c_hoy)
+
+        firma = a["E_a"] & (fb >= c_ini) & (fb <= c_fin)
+        ALTAS, _ = resolver(np.flatnonzero(firma), clave, clave)
+        INCID, _ = resolver(np.flatnonzero(firma & a["E_sin"]), clave, clave)
+        BAJAS, _ = resolver(np.flatnonzero(a["E_b"] & (cae(a["E_eb"]) | cae(a["E_pb"]))),
+                            clave, clave)
+        SEC = BAJAS[(fb[BAJAS] != NAT) & (fb[BAJAS] < c_ini)]
+
+        sumas = {}
+        for tipo, pos in zip(TIPOS, (ALTAS, INCID, BAJAS, SEC)):
+            col = a.get(f"EC_{tipo}")
+            if col is not None:
+                col = por_codigo(a["E_colab"][pos], col[pos], len(self.colab_nombres))
+            sumas[tipo] = (a[f"E_{tipo}"][pos].sum(axis=0, dtype=np.int64), col)
+        return sumas
+
+    # ---------------------------------------------------------------------
+    @classmethod
+    def cargar(cls, ruta) -> "Cubo | None":
+        try:
+            with np.load(ruta, allow_pickle=False) as z:
+                arrays = dict(z)
+        except (OSError, ValueError):
+            return None                   # no está o está dañado → se rehace
+        if int(arrays.pop("version", -1)) != VERSION_CUBO:
+            return None
+        return cls(arrays)
+
+    def guardar(self, ruta):
+        """Guarda el cubo y borra los más antiguos de la misma caché."""
+        ruta = Path(ruta)
+        tmp  = ruta.with_suffix(".tmp")
+        try:
+            ruta.parent.mkdir(exist_ok=True)
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, version=VERSION_CUBO, **self.a)
+            os.replace(tmp, ruta)
+            viejos = sorted(ruta.parent.glob("cubo_*.npz"), key=lambda p: p.stat().st_mtime)
+            for p in viejos[:-CUBOS_GUARDADOS]:
+                p.unlink()
+        except OSError as e:              # OneDrive bloqueando, disco lleno…
+            print(f"⚠️ No se pudo guardar el cubo ({e}); se sigue sin él.")
+
+
+def _acumulada(por_casilla) -> np.ndarray:
+    """Sumas acumuladas con una fila de ceros delante: P[k] = casillas < k."""
+    ceros = np.zeros((1, *por_casilla.shape[1:]), dtype=np.int32)
+    return np.concatenate([ceros, np.cumsum(por_casilla, axis=0, dtype=np.int32)])
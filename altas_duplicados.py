@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+altas_duplicados.py
+-------------------
+Motor único de duplicados del check por FECHA FIRMA.
+
+Cada columna se resume una sola vez en un hash de 64 bits por fila
+(hash_pandas_object) y todas las claves se combinan a partir de esos hashes:
+
+    fila   → todas las columnas       (clones exactos: MAYO + TRAMITACION…)
+    clave  → COLABORADOR + PLAN + CUPS (o DNI/CIF)
+    fecha  → clave + FECHA FIRMA (ALTAS / INCID) · clave + CAIDAS_* (BAJAS)
+
+Que dos filas distintas den el mismo hash es prácticamente imposible, pero se
+comprueba: entre las filas con hash repetido se compara el valor real y, si
+hubiera colisión, se usan ids exactos.
+
+En cada periodo, ALTAS / BAJAS / INCID se resuelven en una pasada (la primera
+fila de cada clave se queda) y se apunta qué se ha eliminado, a favor de qué
+fila y por qué. De ahí sale duplicados_en_altas_bajas.xlsx (informe()).
+"""
+from __future__ import annotations
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+
+QUEDA        = "SE QUEDA"
+MOTIVO_FECHA = "ELIMINADA · misma clave y misma fecha"
+MOTIVO_CLAVE = "ELIMINADA · misma clave, otra fecha"
+
+_BASE, _PRIMO = np.uint64(0xCBF29CE484222325), np.uint64(0x100000001B3)
+
+
+# -------------- HASHES --------------------------------------------------------
+def hashes_columnas(df: pd.DataFrame, cols=None) -> dict:
+    """Hash uint64 por fila de cada columna, una sola vez por columna."""
+    cols = df.columns if cols is None else cols
+    return {c: hash_pandas_object(df[c], index=False).to_numpy() for c in cols}
+
+
+def combina(hashes: dict, cols) -> np.ndarray:
+    """Hash por fila de varias columnas a partir de los de cada una."""
+    cols = list(cols)
+    h = np.full(len(hashes[cols[0]]), _BASE, dtype=np.uint64)
+    for c in cols:
+        h = (h ^ hashes[c]) * _PRIMO
+    return h
+
+
+def exactos(df: pd.DataFrame, cols, h: np.ndarray) -> np.ndarray:
+    """
+    h si distingue exactamente las claves «cols» de df. Solo se comparan
+    valores reales entre las filas con hash repetido; con una colisión se
+    devuelven ids exactos (groupby), igual de válidos para resolver().
+    """
+    cols = list(cols)
+    sosp = np.flatnonzero(pd.Series(h).duplicated(keep=False).to_numpy())
+    if len(sosp) and len(df.iloc[sosp][cols].drop_duplicates()) != len(np.unique(h[sosp])):
+        return df.groupby(cols, dropna=False, sort=False).ngroup().to_numpy().astype(np.uint64)
+    return h
+
+
+def filas_unicas(df: pd.DataFrame) -> tuple[pd.DataFrame, dict]:
+    """
+    df.drop_duplicates() con un hash por fila. Devuelve también los hashes
+    de cada columna de las filas que quedan (para las claves).
+    """
+    hashes = hashes_columnas(df)
+    h = exactos(df, df.columns, combina(hashes, df.columns))
+    quedan = ~pd.Series(h).duplicated().to_numpy()
+    return df[quedan], {c: v[quedan] for c, v in hashes.items()}
+
+
+# -------------- RESOLUCIÓN POR PERIODO -----------------------------------------
+def resolver(pos: np.ndarray, h_clave: np.ndarray, h_fecha: np.ndarray):
+    """
+    Primera fila de cada clave entre las posiciones «pos» (ordenadas), como
+    drop_duplicates(keep="first"). Devuelve (se quedan, eliminadas) con
+    eliminadas = (posiciones, posición de la fila que se queda en su lugar,
+    misma fecha que ella).
+    """
+    _, primera, inversa = np.unique(h_clave[pos], return_index=True, return_inverse=True)
+    fuera = np.ones(len(pos), dtype=bool)
+    fuera[primera] = False
+    elim     = pos[fuera]
+    queda_de = pos[primera[inversa.ravel()[fuera]]]
+    return pos[np.sort(primera)], (elim, queda_de, h_fecha[elim] == h_fecha[queda_de])
+
+
+def informe(raw: pd.DataFrame, eliminadas: dict) -> dict:
+    """
+    {tabla: DataFrame} con cada fila que se queda seguida de las eliminadas
+    a su favor (columnas GRUPO y DUPLICADO). Tablas sin duplicados no salen.
+    """
+    hojas = {}
+    for nombre, (elim, queda_de, misma) in eliminadas.items():
+        if not len(elim):
+            continue
+        quedan = np.unique(queda_de)
+        pos    = np.concatenate([quedan, elim])
+        grupo  = np.concatenate([quedan, queda_de])
+        motivo = np.concatenate([np.full(len(quedan), QUEDA, dtype=object),
+                                 np.where(misma, MOTIVO_FECHA, MOTIVO_CLAVE).astype(object)])
+        orden  = np.lexsort((pos, grupo))             # la que se queda es la primera
+
+        df = raw.iloc[pos[orden]]
+        df = df[[c for c in df.columns if not str(c).startswith("_")]]
+        df.insert(0, "DUPLICADO", motivo[orden])
+        df.insert(0, "GRUPO", np.unique(grupo[orden], return_inverse=True)[1].ravel() + 1)
+        hojas[nombre] = df
+    return hojas
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+altas_informe.py
+----------------
+Composición en memoria del informe de altas: hojas resumen (TOTAL_GLOBAL /
+POR_COLABORADOR) con título del periodo, cabecera, leyenda, colores y anchos;
+hojas por colaborador y hoja LEYENDA. El libro se guarda una sola vez al final.
+
+Lo usan tanto los checks por FECHA FIRMA (una pareja de hojas) como el informe
+multi-periodo (una pareja de hojas por periodo).
+
+También escribe las hojas del informe por colaborador: filas enteras de golpe
+con estilos con nombre (uno por clasificación) en lugar de estilo celda a celda.
+"""
+from __future__ import annotations
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import Cell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+# Colores y estilos
+fills = {
+    "head":  PatternFill("solid", fgColor="B7E1CD"),  # verde cabecera
+    "alta":  PatternFill("solid", fgColor="C6EFCE"),  # 🟢 verde claro
+    "alta_loc": PatternFill("solid", fgColor="C6EFCE"),  # 🟢 verde claro (altas Mieres/Lena/Pymes)
+    "baja":  PatternFill("solid", fgColor="FFC7CE"),  # 🔴 rojo claro
+    "inci":  PatternFill("solid", fgColor="FFF599"),  # 🟡 amarillo
+    "title": PatternFill("solid", fgColor="FBE4D5"),
+    "total": PatternFill("solid", fgColor="BDD7EE"),
+    "leyenda": PatternFill("solid", fgColor="FFF599"),  # Amarillo específico para leyenda
+    "total_full": PatternFill("solid", fgColor="FFEB9C")  # Amarillo más intenso para fila TOTAL
+}
+fonts = {"head":Font(bold=True), "title":Font(bold=True, size=12)}
+align = Alignment(horizontal="center", vertical="center")
+border= Border(*(Side("thin") for _ in range(4)))
+
+LEYENDA_TOTAL = [
+    "LEYENDA:",
+    "• 🔼 ALTA: Firma dentro del período y fecha de CAÍDA vacía.",
+    "• 🔽 BAJA: Fecha de CAÍDAS dentro del período (independiente de la alta).",
+    "• 🔙 CAIDAS_FECHA_PASADA: Son las caídas cuya fecha de firma es anterior a la fecha de inicio pero su caída está en ese rango.",
+    "• ⚠️ *INCIDENCIA*: Firma dentro del período sin alta válida ni caída.",
+    "ℹ️ *RECUERDA*: Las altas con incidencia (RECHAZO, T/A, etc.) se muestran en amarillo y no cuentan como altas ni como bajas."
+]
+
+
+def auto_width(ws):
+    for col in ws.columns:
+        ws.column_dimensions[get_column_letter(col[0].column)].width = (
+            max(len(str(c.value)) for c in col if c.value) + 2
+        )
+
+
+def texto_periodo(d_ini, d_fin):
+    return f"📅 PERÍODO: {d_ini:%d-%m-%Y} → {d_fin:%d-%m-%Y}"
+
+
+def hoja_resumen(wb, nombre, df, tipo, per_txt):
+    """
+    Escribe en «nombre» una tabla resumen ya con su formato final: título con
+    el periodo (fila 1), cabecera (fila 2), datos y, en TOTAL_GLOBAL, leyenda.
+    tipo: "TOTAL_GLOBAL" o "POR_COLABORADOR".
+    Se compone en memoria de arriba abajo, sin insert_rows ni reabrir el libro.
+    """
+    ws = wb.create_sheet(title=nombre)
+    ws.append([per_txt])
+    ws.append(list(df.columns))
+    for fila in df.itertuples(index=False, name=None):
+        ws.append(list(fila))
+
+    # Formatear título
+    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=ws.max_column)
+    hdr = ws.cell(1, 1)
+    hdr.fill, hdr.font, hdr.alignment = fills["title"], fonts["title"], align
+
+    # Formatear encabezados
+    for c in ws[2]:
+        c.fill, c.font, c.alignment, c.border = fills["head"], fonts["head"], align, border
+    header = [cell.value for cell in ws[2]]
+
+    # Formatear datos (excluyendo la leyenda)
+    if tipo == "TOTAL_GLOBAL":
+        # Primero creamos la leyenda completamente aislada, tras 3 filas vacías
+        BLANK_ROWS = 3
+        data_end_row = ws.max_row
+
+        # Marcar filas de leyenda para excluirlas del formateo posterior
+        legend_start_row = data_end_row + BLANK_ROWS + 1
+
+        border_thin = Border(
+        left=Side(style="thin"),
+        right=Side(style="thin"),
+        top=Side(style="thin"),
+        bottom=Side(style="thin")
+        )
+
+        # Aplicar formato a la leyenda
+        for i, text in enumerate(LEYENDA_TOTAL):
+            row_num = legend_start_row + i
+            ws.merge_cells(start_row=row_num, start_column=1,
+                          end_row=row_num, end_column=ws.max_column)
+            cell = ws.cell(row=row_num, column=1, value=text)
+            cell.fill = fills["leyenda"]
+            cell.border = border_thin
+            if i == 0:
+                cell.font = Font(bold=True)
+                cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
+            else:
+                cell.font = Font(italic=True)
+                cell.alignment = Alignment(horizontal="left", vertical="center", wrap_text=True, indent=1)
+
+        # Bordes gruesos para la leyenda
+        thick = Side(style="medium")
+        for col in range(1, ws.max_column + 1):
+            top_cell = ws.cell(row=legend_start_row, column=col)
+            bot_cell = ws.cell(row=legend_start_row + len(LEYENDA_TOTAL) - 1, column=col)
+            top_cell.border = Border(top=thick, left=border_thin.left,
+                                    right=border_thin.right, bottom=border_thin.bottom)
+            bot_cell.border = Border(bottom=thick, left=border_thin.left,
+                                     right=border_thin.right, top=border_thin.top)
+
+        # Ajustar el rango de formateo para excluir la leyenda
+        max_data_row = data_end_row
+    else:
+        max_data_row = ws.max_row
+
+    # ----------------------------------------------------------
+    # Formateo de cada fila de datos
+    for row_cells in ws.iter_rows(min_row=3, max_row=max_data_row):
+        primera_celda = row_cells[0].value
+        if primera_celda is None:
+            continue
+
+        # ---------- ajustes comunes ----------
+        for c in row_cells:
+            c.alignment, c.border = align, border
+
+        # ---------- color según hoja ----------
+        if tipo == "POR_COLABORADOR":
+            # Si el indicador contiene "_ALTA" → verde, en otro caso rojo (incluyendo PTG)
+            color = "alta" if "_ALTA" in str(primera_celda) else "baja"
+            for c in row_cells:
+                c.fill = fills[color]
+        else:  # hoja TOTAL_GLOBAL
+            for c in row_cells:
+                cabecera = ws.cell(row=2, column=c.column).value
+                if primera_celda == "TOTAL":
+                    c.fill = fills["total_full"]
+                    c.font = Font(bold=True)
+                elif cabecera == "TOTALES":
+                    c.fill = fills["total"]
+                elif primera_celda == "ALTAS CON INCIDENCIA":
+                    c.fill = fills["inci"]
+                elif cabecera and cabecera.startswith("ALTAS_"):
+                    c.fill = fills["alta_loc"]
+                elif cabecera and cabecera.startswith("BAJAS_"):
+                    c.fill = fills["baja"]
+    # ---------------- fin del for row_cells -------------------
+
+    # ► fusiona ALTAS/BAJAS de cada sede en la fila TOTAL
+    if tipo == "TOTAL_GLOBAL":
+        fila_total = None
+        for row in ws.iter_rows(min_row=3, max_row=ws.max_row):
+            if row[0].value == "TOTAL":
+                fila_total = row[0].row
+                break
+
+        if fila_total:
+            # Fusionar celdas de cada sede
+            for col_a, col_b in [("ALTAS_LENA", "BAJAS_LENA"),
+                                 ("ALTAS_MIERES", "BAJAS_MIERES"),
+                                 ("ALTAS_PYMES", "BAJAS_PYMES")]:
+                if col_a in header and col_b in header:
+                    i_a = header.index(col_a) + 1
+                    i_b = header.index(col_b) + 1
+                    ws.merge_cells(start_row=fila_total, start_column=i_a,
+                                   end_row=fila_total, end_column=i_b)
+                    ws.cell(row=fila_total, column=i_a).alignment = align
+                    ws.cell(row=fila_total, column=i_a).fill = fills["total_full"]
+
+    auto_width(ws)
+
+    if tipo == "TOTAL_GLOBAL":
+            max_allowed = 25
+            if ws.column_dimensions['A'].width > max_allowed:
+                ws.column_dimensions['A'].width = max_allowed
+    return ws
+
+
+# -------------- HOJAS POR COLABORADOR ---------------------------------------
+# ---------- columnas definitivas ---------------------------------------------
+COLS_COLAB = [
+    "INDICE","COLABORADOR","NOMBRE DEL CLIENTE","DNI/CIF",
+    "PLAN","POTENCIA","OFERTA PRESENTADA","SERVICIOS",
+    "FECHA FIRMA","FECHA ALTA","OBSERV.","CAIDAS_E_Y_G","CAIDAS_P&S","CHECK ALTAS",
+    "VIENE GRACIAS A :","OTROS"
+]
+
+# color de cada clase de altas_calculo.CLASES_TRAM
+COLORES_CLASE = {
+    "ALTA":               "D5F5D3",
+    "BAJA":               "FFC7CE",
+    "INCIDENCIA":         "FFF2CC",
+    "CAIDA FECHA PASADA": "C9DAF8",
+}
+FMT_FECHA_XL = "yyyy-mm-dd h:mm:ss"      # el que pone openpyxl a las fechas
+EST_CABECERA = "colab cabecera"
+
+
+def _estilos_colab(wb):
+    """
+    Registra (una vez por libro) los estilos con nombre de las hojas por
+    colaborador y devuelve {(clase, es_fecha): StyleArray}.
+    """
+    centro = Alignment(horizontal="center", vertical="center")
+    nuevos = [NamedStyle(name=EST_CABECERA,
+                         fill=PatternFill("solid", fgColor="E3E4FA"),   # lavanda pálido
+                         font=Font(bold=True, size=12),
+                         border=Border(*(Side("thin") for _ in range(4))),
+                         alignment=Alignment(horizontal="center", vertical="center",
+                                             text_rotation=90, wrap_text=True))]
+    for clase, color in COLORES_CLASE.items():
+        for nombre, fmt in ((f"colab {clase}", "General"),
+                            (f"colab {clase} fecha", FMT_FECHA_XL)):
+            nuevos.append(NamedStyle(name=nombre, fill=PatternFill("solid", fgColor=color),
+                                     font=DEFAULT_FONT, border=DEFAULT_BORDER,
+                                     alignment=centro, number_format=fmt))
+    for est in nuevos:
+        if est.name not in wb.named_styles:
+            wb.add_named_style(est)
+
+    por_nombre = {est.name: est for est in wb._named_styles}
+    return {(clase, fecha): por_nombre[f"colab {clase}" + (" fecha" if fecha else "")].as_tuple()
+            for clase in COLORES_CLASE for fecha in (False, True)}
+
+
+def escribir_hoja_colaborador(wb, nombre, df_fil):
+    """
+    Crea la hoja «nombre» con las filas de un colaborador (ya clasificadas, con
+    columna CLASE) y le da formato. Cada celda nace con el estilo de su clase,
+    así que no se crea ningún objeto de estilo por celda.
+    """
+    estilos = _estilos_colab(wb)
+    ws = wb.create_sheet(title=nombre)
+
+    # -------------- CABECERA ------------------------------------------------
+    cab = []
+    for h in COLS_COLAB:
+        c = Cell(ws, value=h)
+        c.style = EST_CABECERA
+        cab.append(c)
+    ws.append(cab)
+    ws.row_dimensions[1].height = 80   # alto suficiente
+
+    # -------------- DATOS ---------------------------------------------------
+    datos = df_fil.copy()
+    datos.insert(0, "INDICE", range(1, len(datos) + 1))   # columna numerada
+    clases = datos["CLASE"].tolist()
+    datos = datos[COLS_COLAB]
+    es_fecha = [pd.api.types.is_datetime64_any_dtype(datos[c]) for c in COLS_COLAB]
+
+    for clase, fila in zip(clases, datos.itertuples(index=False, name=None)):
+        ws.append([Cell(ws, value=v, style_array=estilos[clase, f])
+                   for v, f in zip(fila, es_fecha)])
+
+    auto_width(ws)
+    return ws
+
+
+# -------------- LEYENDA -----------------------------------------------------
+# Define la leyenda global
+LEYENDA_COLAB = [
+    ('🟩 ALTA',       "Firma entre fecha de inicio y fecha fin, sin caída",      'ALTA'),
+    ('🟥 BAJA',       "Caída entre fecha de inicio y fecha fin",                 'BAJA'),
+    ('🟨 INCIDENCIA', "Firma en rango, sin alta ni caída",                      'INCIDENCIA'),
+    ('🟦 CAIDAS CON FIRMA ANTERIOR', "Firma < fecha de inicio y caída entre inicio y hoy",    'CAIDA FECHA PASADA'),
+]
+
+
+def hoja_leyenda(wb):
+    # — Crear o limpiar la hoja de leyenda —
+    if "LEYENDA" in wb.sheetnames:
+        ws_ley = wb["LEYENDA"]
+        # si ya existía, borra todo su contenido:
+        for row in ws_ley["A1:D4"]:
+            for cell in row:
+                cell.value = None
+    else:
+        ws_ley = wb.create_sheet(title="LEYENDA")
+
+    border_top = Border(top=Side(style="medium"))
+    border_bot = Border(bottom=Side(style="medium"))
+    font_ital  = Font(italic=True)
+
+    # Escribe las 4 filas de leyenda en A1:D4
+    for i, (lbl, desc, clase) in enumerate(LEYENDA_COLAB, start=1):
+        ws_ley.merge_cells(start_row=i, start_column=1, end_row=i, end_column=4)
+        cell = ws_ley.cell(row=i, column=1, value=f"{lbl}: {desc}")
+        cell.fill      = PatternFill("solid", fgColor=COLORES_CLASE[clase])
+        cell.font      = font_ital
+        cell.alignment = Alignment(horizontal="left", vertical="center")
+        ws_ley.row_dimensions[i].height = 20
+        # bordes gruesos en primera y última fila
+        if i == 1:
+            cell.border = border_top
+        elif i == len(LEYENDA_COLAB):
+            cell.border = border_bot
+
+    # Ajusta el ancho de columnas A–D para que el texto quepa
+    for col in range(1, 5):
+        ws_ley.column_dimensions[get_column_letter(col)].width = 50
+    return ws_ley
+
+
+def libro_vacio():
+    """Workbook sin la hoja «Sheet» que crea openpyxl por defecto."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    return wb
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+altas_normaliza.py
+------------------
+Normalización de cada hoja del libro de altas, separada por «perfil» según la
+etapa que la consume:
+
+    mes   → hoja(s) del mes analizado (base de ALTAS / BAJAS / INCID)
+    tram  → TRAMITACION y sus 2 siguientes, solo filas con CAIDAS
+    colab → TRAMITACION y sus 2 siguientes para el informe por colaborador
+    formulas → hoja FORMULAS (listas maestras, ver altas_taxonomia.py)
+
+Son funciones puras hoja → hoja, de modo que el resultado se puede guardar en
+caché (ver altas_cache.py) y reutilizar mientras la hoja no cambie. Cuando
+cambia, aplicar_perfil() solo normaliza las filas nuevas o editadas.
+"""
+from __future__ import annotations
+import hashlib, re
+from datetime import datetime
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from pandas.util import hash_pandas_object
+from altas_carga import sin_tildes
+
+# Súbelo si cambia cualquier perfil: invalida las cachés ya guardadas
+VERSION_PERFILES = 3
+
+COLS_TEXTO = ["PUNTO ATENCION", "SERVICIOS", "COMUNIDAD", "OFERTA PRESENTADA", "COLABORADOR"]
+COLS_ID    = ["CUPS", "DNI/CIF"]
+COLS_FECHA = ["FECHA FIRMA", "FECHA ALTA", "CAIDAS_E_Y_G", "CAIDAS_P&S"]
+RENOMBRA   = {"CODICO COMERCIAL": "CODIGO COMERCIAL"}     # por si aparece mal escrito
+
+# Únicas columnas que se leen del Excel (cabecera normalizada): las que usan
+# los cálculos, la clave de duplicados y las hojas por colaborador. Añade aquí
+# cualquier columna nueva que necesite un informe.
+COLS_USADAS = frozenset(
+    COLS_TEXTO + COLS_ID + COLS_FECHA + list(RENOMBRA) + list(RENOMBRA.values()) + [
+        "PLAN", "CAIDAS",                               # CAIDAS: check por FECHA ALTA
+        "NOMBRE DEL CLIENTE", "POTENCIA", "OBSERV.", "CHECK ALTAS",
+        "VIENE GRACIAS A :", "OTROS",
+    ]
+)
+
+
+def normaliza_cabeceras(df: pd.DataFrame) -> pd.DataFrame:
+    """Tildes, espacios y mayúsculas en los nombres de columna."""
+    df.columns = [sin_tildes(str(c)).upper().strip() for c in df.columns]
+    return df
+
+
+# ─── Limpieza por valor distinto ──────────────────────────────────────────
+# Una columna tiene miles de filas pero pocas decenas de valores distintos:
+# se factoriza, se limpia cada valor una vez y se reparte por código. Lo ya
+# limpiado queda memorizado para las demás hojas (y ejecuciones del proceso).
+_ESPACIOS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1 << 16)
+def limpia_texto(txt: str, sep=" ") -> str:
+    """Mayúsculas, sin espacios en los extremos y cada racha de espacios → sep."""
+    return _ESPACIOS.sub(sep, txt.upper().strip())
+
+
+def por_valor(serie: pd.Series, f, dtype=object) -> pd.Series:
+    """f() una sola vez por valor distinto de la serie (NaN incluido)."""
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=False)
+    valores = np.array([f(u) for u in unicos], dtype=dtype)
+    return pd.Series(valores[codigos], index=serie.index, name=serie.name)
+
+
+def normaliza_texto(serie: pd.Series, sep=" ") -> pd.Series:
+    """= astype(str).str.upper().str.strip().str.replace(r"\s+", sep)"""
+    return por_valor(serie.astype(str), lambda v: limpia_texto(v, sep))
+
+
+# ─── Fechas tal como llegan del Excel ─────────────────────────────────────
+# Estado de cada celda de fecha (int8). Los textos que no son fecha llevan
+# TEXTO o, si contienen uno de los «estados» pedidos (T/A, RECHAZADO…, ver
+# altas_taxonomia.ESTADOS_INCID), su posición + 1: estado > 0 ↔ incidencia.
+VACIA, FECHA, TEXTO = -2, -1, 0
+ORIGEN_EXCEL = pd.Timestamp("1899-12-30")        # día 0 de las fechas-número
+
+
+def fecha_excel(serie: pd.Series, estados=()) -> tuple[pd.Series, np.ndarray]:
+    """
+    Convierte una columna de fechas del Excel en una sola pasada por valor
+    distinto: fecha real → tal cual; número → fecha-número de Excel; texto →
+    dd/mm/aaaa (día primero). Devuelve (fechas datetime64, estado por fila).
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie, np.where(serie.notna(), FECHA, VACIA).astype(np.int8)
+
+    codigos, unicos = pd.factorize(serie)           # NaN → −1
+    unicos = list(unicos)
+    fechas = np.full(len(unicos) + 1, np.datetime64("NaT"), dtype="datetime64[ns]")
+    estado = np.full(len(unicos) + 1, VACIA, dtype=np.int8)    # −1 → último → VACIA
+
+    tipos = {"fecha": [], "numero": [], "texto": []}
+    for i, v in enumerate(unicos):
+        if isinstance(v, (datetime, np.datetime64)):
+            tipos["fecha"].append(i)
+        elif isinstance(v, (int, float, np.number)) and not isinstance(v, bool):
+            if 0 < v < 2_958_466:                  # 01-01-1900 … 31-12-9999
+                tipos["numero"].append(i)
+            else:
+                tipos["texto"].append(i)
+        else:
+            tipos["texto"].append(i)
+
+    i = tipos["fecha"]
+    fechas[i] = pd.to_datetime([unicos[j] for j in i]).to_numpy("datetime64[ns]")
+    i = tipos["numero"]
+    fechas[i] = (ORIGEN_EXCEL + pd.to_timedelta([float(unicos[j]) for j in i], unit="D")).to_numpy()
+    i = tipos["texto"]
+    textos = [str(unicos[j]).strip() for j in i]
+    fechas[i] = pd.to_datetime(textos, dayfirst=True, format="mixed", errors="coerce").to_numpy()
+
+    estado[:-1] = np.where(np.isnat(fechas[:-1]), TEXTO, FECHA)
+    mayus = [e.upper() for e in estados]
+    for j, txt in zip(i, textos):
+        if estado[j] == TEXTO:
+            txt = txt.upper()
+            estado[j] = next((k + 1 for k, e in enumerate(mayus) if e in txt), TEXTO)
+
+    return (pd.Series(fechas[codigos], index=serie.index, name=serie.name),
+            estado[codigos])
+
+
+def perfil_mes(df: pd.DataFrame) -> pd.DataFrame:
+    df = normaliza_cabeceras(df.drop_duplicates())
+
+    # ─── Normaliza identificadores de contrato / cliente ──────────────────
+    for col_norm in COLS_ID:
+        if col_norm in df.columns:
+            df[col_norm] = normaliza_texto(df[col_norm], sep="")
+
+    # ─── Renombra columnas erróneas (por si aparece mal escrito) ──────────
+    df = df.rename(columns=RENOMBRA)
+
+    # ─── FILTRA FILAS CON CABECERAS PEGADAS O VACÍAS ──────────────────────
+    # (con todas las cabeceras de la hoja, también las que no se han leído)
+    header_like = set(df.columns)
+    header_like.update(RENOMBRA.get(c, c) for c in
+                       (sin_tildes(str(c)).upper().strip() for c in df.attrs.get("cabecera", [])))
+    header_like.update({"DOC. SUBIDA"})
+    df = df[~por_valor(df["COLABORADOR"], lambda v: isinstance(v, str) and v.upper() in header_like, bool)]
+    df = df[por_valor(df["COLABORADOR"], lambda v: not isinstance(v, str) or v.strip() != "", bool)].copy()
+
+    # ─── Normaliza campos de texto clave ──────────────────────────────────
+    for c in COLS_TEXTO:
+        df[c] = normaliza_texto(df[c])
+    return df
+
+
+def perfil_tram(df: pd.DataFrame) -> pd.DataFrame:
+    df = normaliza_cabeceras(df)
+
+    # normaliza los mismos campos clave que «raw»
+    for col in COLS_TEXTO:
+        if col in df.columns:
+            df[col] = normaliza_texto(df[col])
+
+    # sólo filas con fecha en CAIDAS → son las BAJAS
+    mask_baja_tram = (
+        (df["CAIDAS_E_Y_G"].notna() if "CAIDAS_E_Y_G" in df.columns else False) |
+        (df["CAIDAS_P&S"].notna()   if "CAIDAS_P&S"   in df.columns else False)
+    )
+    return df[mask_baja_tram]
+
+
+def perfil_colab(df: pd.DataFrame) -> pd.DataFrame:
+    df = normaliza_cabeceras(df)
+    for c in COLS_FECHA:
+        if c in df.columns:
+            df[c] = fecha_excel(df[c])[0]
+    return df
+
+
+def perfil_formulas(df: pd.DataFrame) -> pd.DataFrame:
+    # cada columna es una lista independiente (PLAN, SERVICIOS…)
+    return normaliza_cabeceras(df).rename(columns=RENOMBRA)
+
+
+PERFILES = {
+    "mes":      perfil_mes,
+    "tram":     perfil_tram,
+    "colab":    perfil_colab,
+    "formulas": perfil_formulas,
+}
+
+
+# -------------- LECTURA INCREMENTAL -----------------------------------------
+# Perfiles que tratan cada fila por separado: al volver a leer una hoja que ha
+# cambiado, las filas que siguen igual (mismo número de fila, mismos valores)
+# se toman del resultado anterior y solo las nuevas o editadas pasan por el
+# perfil. Las borradas desaparecen solas: ya no están en la hoja.
+POR_FILAS  = {"mes", "tram", "colab"}
+COL_HUELLA = "\x00huella"              # huella de la fila leída (columna auxiliar)
+
+
+def huellas_filas(df: pd.DataFrame) -> np.ndarray:
+    """
+    Huella uint64 de cada fila leída: sus valores y su número de fila. La
+    cabecera, los tipos de columna y VERSION_PERFILES entran como semilla:
+    si cambian, cambian todas.
+    """
+    semilla = hashlib.sha1(repr([VERSION_PERFILES, [str(c) for c in df.columns],
+                                 [str(t) for t in df.dtypes],
+                                 df.attrs.get("cabecera", [])]).encode()).digest()
+    h = hash_pandas_object(df, index=True).to_numpy(dtype=np.uint64)
+    return h ^ np.frombuffer(semilla[:8], dtype=np.uint64)[0]
+
+
+def aplicar_perfil(perfil, df: pd.DataFrame, previo=None) -> pd.DataFrame:
+    """
+    PERFILES[perfil](df) con la huella de cada fila en COL_HUELLA. previo:
+    resultado anterior de la misma hoja (con COL_HUELLA); en los perfiles
+    POR_FILAS, sus filas con la misma huella se reutilizan tal cual.
+    """
+    previas = None if previo is None else previo.get(COL_HUELLA)
+    return unir_con_previo(*perfil_por_filas(perfil, df, previas), previo)
+
+
+def perfil_por_filas(perfil, df: pd.DataFrame, previas=None):
+    """
+    Mitad de aplicar_perfil que necesita la hoja leída (la que hacen los
+    procesos hijos de altas_cache): previas es la COL_HUELLA del resultado
+    anterior. Devuelve (filas que pasan por el perfil, con COL_HUELLA;
+    huellas de las que se reutilizan, por número de fila).
+    """
+    huellas = pd.Series(huellas_filas(df), index=df.index)
+    if previas is None or perfil not in POR_FILAS:
+        out = PERFILES[perfil](df)
+        iguales = huellas.iloc[:0]
+    else:
+        if perfil == "mes":                 # el drop_duplicates de perfil_mes, con toda la hoja
+            df = df[~df.duplicated()]
+        igual = df.index.isin(previas.index)
+        pos   = df.index[igual]
+        igual[igual] = previas.reindex(pos).to_numpy() == huellas[pos].to_numpy()
+
+        out = PERFILES[perfil](df[~igual].copy())
+        iguales = huellas[df.index[igual]]
+    return out.assign(**{COL_HUELLA: huellas.reindex(out.index).to_numpy()}), iguales
+
+
+def unir_con_previo(nuevas: pd.DataFrame, iguales: pd.Series, previo=None) -> pd.DataFrame:
+    """Completa «nuevas» con las filas de «previo» cuyas huellas son «iguales»."""
+    if not len(iguales):
+        return nuevas
+    viejas = previo.loc[iguales.index].assign(**{COL_HUELLA: iguales.to_numpy()})
+    return pd.concat([viejas, nuevas]).sort_index() if len(nuevas) else viejas
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+altas_opciones.py
+-----------------
+Argumentos de línea de comandos (y fichero de configuración JSON) comunes a
+los scripts de check de altas, para poder lanzarlos sin nadie al teclado.
+
+Forma clásica (la que usan los .bat, sigue funcionando):
+    python checks_altasFILTRO_FIRMA_OFICI.py 01-05-2025 31-05-2025 [MAYO]
+
+Modo desatendido (tarea programada): nunca pregunta; si falta algo, error.
+    python checks_altasFILTRO_FIRMA_OFICI.py --batch --hojas MAYO \\
+           --desde 01-05-2025 --hasta hoy --por-colaborador \\
+           --salida "D:\\Informes" --no-abrir
+
+Con --config informes.json se leen las mismas claves desde un JSON
+(hojas, desde, hasta, por_colaborador, bd, vigilar, salida, abrir, batch); lo que
+venga por línea de comandos tiene prioridad sobre el fichero.
+
+Con --vigilar el script no termina: rehace el informe cada vez que cambia el
+libro (altas_vigilancia.py). Implica --batch y nunca abre el Excel; «hoy» y
+«ayer» se recalculan en cada vuelta.
+"""
+from __future__ import annotations
+import argparse, json, os
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+FMT_FECHA = "%d-%m-%Y"
+
+
+def parse_fecha(txt) -> pd.Timestamp:
+    """dd-mm-aaaa, o «hoy» / «ayer»."""
+    txt = str(txt).strip().lower()
+    hoy = pd.to_datetime(datetime.today().date())
+    if txt == "hoy":
+        return hoy
+    if txt == "ayer":
+        return hoy - pd.Timedelta(days=1)
+    return pd.to_datetime(txt, format=FMT_FECHA)
+
+
+def ask_date(msg: str):
+    while True:
+        txt = input(f"{msg} (dd-mm-aaaa): ").strip()
+        try:
+            return pd.to_datetime(txt, format=FMT_FECHA)
+        except ValueError:
+            print("❌ Formato incorrecto.")
+
+
+def parse_periodo(txt):
+    """«DESDE:HASTA» → (d_ini, d_fin)."""
+    desde, sep, hasta = str(txt).partition(":")
+    if not sep:
+        raise ValueError(txt)
+    d_ini, d_fin = parse_fecha(desde), parse_fecha(hasta)
+    if d_fin < d_ini:
+        raise ValueError(txt)
+    return d_ini, d_fin
+
+
+def periodos_predefinidos(hasta, semanas=0, meses=0, mes_en_curso=False):
+    """
+    Periodos habituales que terminan en «hasta» (incluido):
+      · semanas=N → las N últimas semanas de lunes a domingo (la última, recortada)
+      · meses=N   → los N últimos meses naturales (el último, recortado)
+      · mes_en_curso → del día 1 del mes de «hasta» a «hasta»
+    """
+    periodos = []
+    lunes = hasta - pd.Timedelta(days=hasta.weekday())
+    for i in range(semanas - 1, -1, -1):
+        ini = lunes - pd.Timedelta(weeks=i)
+        periodos.append((ini, min(ini + pd.Timedelta(days=6), hasta)))
+    primero = hasta.replace(day=1)
+    for i in range(meses - 1, -1, -1):
+        ini = primero - pd.DateOffset(months=i)
+        periodos.append((ini, min(ini + pd.offsets.MonthEnd(0), hasta)))
+    if mes_en_curso:
+        periodos.append((primero, hasta))
+    return list(dict.fromkeys(periodos))
+
+
+def leer_opciones(descripcion="", argv=None, por_colaborador=True, periodos=False, bd=False,
+                  vigilar=False, abrir=True):
+    p = argparse.ArgumentParser(description=descripcion,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("clasico", nargs="*", metavar="DESDE HASTA [HOJA]",
+                   help="forma clásica: fechas dd-mm-aaaa y, opcionalmente, la hoja")
+    p.add_argument("--hojas", "--hoja", nargs="+", metavar="HOJA",
+                   help="hoja(s) del mes a analizar (MAYO, JUNIO…)")
+    p.add_argument("--desde", metavar="dd-mm-aaaa", help="fecha inicial (o «hoy», «ayer»)")
+    p.add_argument("--hasta", metavar="dd-mm-aaaa", help="fecha final (o «hoy», «ayer»)")
+    if por_colaborador:
+        p.add_argument("--por-colaborador", dest="por_colaborador", default=None,
+                       action=argparse.BooleanOptionalAction,
+                       help="añadir (o no) una hoja por colaborador; en --batch, por defecto no")
+    if periodos:
+        p.add_argument("--periodo", dest="periodos", action="append", metavar="DESDE:HASTA",
+                       help="periodo a calcular (se puede repetir), p. ej. 01-05-2025:31-05-2025")
+        p.add_argument("--semanas", type=int, metavar="N",
+                       help="añade las N últimas semanas (lunes a domingo) hasta --hasta")
+        p.add_argument("--meses", type=int, metavar="N",
+                       help="añade los N últimos meses naturales hasta --hasta")
+        p.add_argument("--mes-en-curso", dest="mes_en_curso", action="store_true", default=None,
+                       help="añade del día 1 del mes a --hasta")
+    if bd:
+        p.add_argument("--bd", action="store_true", default=None,
+                       help="calcular desde el histórico SQLite (altas_bd.py): vale también "
+                            "para meses que ya no están en el libro")
+    if vigilar:
+        p.add_argument("--vigilar", action="store_true", default=None,
+                       help="quedarse vigilando el libro y rehacer el informe cuando cambie "
+                            "(implica --batch)")
+    p.add_argument("--salida", metavar="RUTA",
+                   help="fichero .xlsx de salida, o carpeta donde dejarlo")
+    if abrir:
+        p.add_argument("--no-abrir", dest="abrir", action="store_false", default=None,
+                       help="no abrir el Excel al terminar")
+    p.add_argument("--batch", action="store_true", default=None,
+                   help="modo desatendido: no pregunta nada ni abre el Excel")
+    p.add_argument("--config", metavar="JSON", help="fichero con las mismas opciones")
+    a = p.parse_args(argv)
+
+    # ─── fichero de configuración (la línea de comandos manda) ───────────
+    if a.config:
+        try:
+            cfg = json.loads(Path(a.config).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            p.error(f"no se puede leer {a.config}: {e}")
+        for k, v in cfg.items():
+            if k not in vars(a):
+                p.error(f"clave desconocida en {a.config}: {k}")
+            if getattr(a, k) is None:
+                setattr(a, k, v)
+
+    # ─── forma clásica: DESDE HASTA [HOJA] ───────────────────────────────
+    if len(a.clasico) not in (0, 2, 3):
+        p.error("la forma clásica es: DESDE HASTA [HOJA]")
+    if a.clasico:
+        a.desde = a.desde or a.clasico[0]
+        a.hasta = a.hasta or a.clasico[1]
+        if len(a.clasico) == 3 and not a.hojas:
+            a.hojas = [a.clasico[2]]
+
+    if isinstance(a.hojas, str):
+        a.hojas = [a.hojas]
+    a.hojas = [h.strip().upper() for h in a.hojas] if a.hojas else None
+    try:
+        a.d_ini = parse_fecha(a.desde) if a.desde else None
+        a.d_fin = parse_fecha(a.hasta) if a.hasta else None
+    except ValueError:
+        p.error("formato de fecha incorrecto (dd-mm-aaaa)")
+
+    a.vigilar = bool(getattr(a, "vigilar", False))
+    a.batch   = bool(a.batch) or a.vigilar
+    if periodos:
+        try:
+            a.periodos = [parse_periodo(t) for t in (a.periodos or [])]
+        except ValueError as e:
+            p.error(f"periodo incorrecto «{e}» (DESDE:HASTA con fechas dd-mm-aaaa)")
+        if a.semanas or a.meses or a.mes_en_curso:
+            hasta = a.d_fin if a.d_fin is not None else parse_fecha("hoy")
+            a.periodos += periodos_predefinidos(hasta, a.semanas or 0, a.meses or 0,
+                                                bool(a.mes_en_curso))
+        if a.d_ini is not None and a.d_fin is not None:
+            a.periodos.insert(0, (a.d_ini, a.d_fin))
+        a.periodos = list(dict.fromkeys(a.periodos))
+        if a.batch and not (a.hojas and a.periodos):
+            p.error("en modo --batch hay que indicar --hojas y algún periodo")
+    elif a.batch and not (a.hojas and a.d_ini is not None and a.d_fin is not None):
+        p.error("en modo --batch hay que indicar --hojas, --desde y --hasta")
+    a.abrir = getattr(a, "abrir", False) if abrir else False
+    if a.abrir is None:
+        a.abrir = not a.batch
+    a.abrir = a.abrir and hasattr(os, "startfile") and not a.vigilar   # solo Windows
+    if not por_colaborador:
+        a.por_colaborador = False
+    a.bd = bool(getattr(a, "bd", False))
+    a.salida = Path(a.salida) if a.salida else None
+    a.error = p.error
+    return a
+
+
+# -------------- VALORES QUE PUEDEN PEDIRSE POR TECLADO ----------------------
+def pedir_hojas(opts, pregunta):
+    if opts.hojas:
+        return opts.hojas
+    return [input(pregunta).strip().upper()]
+
+
+def pedir_fechas(opts):
+    if opts.d_ini is not None and opts.d_fin is not None:
+        return opts.d_ini, opts.d_fin
+    print("⚠️ Sin fechas → pedir.")
+    d_ini = opts.d_ini if opts.d_ini is not None else ask_date("Desde")
+    d_fin = opts.d_fin if opts.d_fin is not None else ask_date("Hasta")
+    return d_ini, d_fin
+
+
+def pedir_periodo():
+    """Desde / Hasta por teclado; se repite si Hasta es anterior a Desde."""
+    while True:
+        d_ini, d_fin = ask_date("Desde"), ask_date("Hasta")
+        if d_fin >= d_ini:
+            return d_ini, d_fin
+        print("❌ «Hasta» es anterior a «Desde».")
+
+
+def pedir_por_colaborador(opts, pregunta):
+    if opts.por_colaborador is not None:
+        return bool(opts.por_colaborador)
+    if opts.batch:
+        return False
+    return input(pregunta).strip().upper() == "S"
+
+
+def ruta_salida(opts, por_defecto: Path) -> Path:
+    """--salida puede ser un fichero o una carpeta (se usa el nombre por defecto)."""
+    if opts.salida is None:
+        return por_defecto
+    if opts.salida.is_dir() or not opts.salida.suffix:
+        opts.salida.mkdir(parents=True, exist_ok=True)
+        return opts.salida / por_defecto.name
+    return opts.salida
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+altas_servidor.py
+-----------------
+Servidor residente (opcional) para los .bat: un proceso Python que se queda
+abierto con pandas/openpyxl ya importados y las hojas normalizadas en memoria
+(altas_cache.MEMORIA). Los .bat llaman a altas_cliente.py, que le pasa el
+script y sus argumentos; el script se ejecuta aquí tal cual y su salida y sus
+preguntas van y vienen por el socket. Sin servidor, el cliente ejecuta el
+script como siempre.
+
+    python altas_servidor.py                  # o Ejecuta_Servidor.bat
+    python altas_cliente.py checks_altasFILTRO_FIRMA_OFICI.py 01-05-2025 31-05-2025
+
+Solo escucha en 127.0.0.1 (puerto PUERTO, o la variable ALTAS_PUERTO) y solo
+ejecuta los checks_altas*.py de su misma carpeta. Atiende una petición cada
+vez. Vigila cada libro que ha cargado (altas_vigilancia.py) y, cuando cambia,
+vuelve a cargar en segundo plano las hojas que tenía en memoria (solo las
+filas nuevas o editadas), para que la siguiente petición ya las encuentre al
+día.
+
+Si se cambia el código, hay que reiniciar el servidor.
+"""
+from __future__ import annotations
+import io, json, os, socketserver, sys, threading, time, traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+import altas_cache
+from altas_cache import CacheAltas
+from altas_vigilancia import esperar_cambio, estado
+# lo que importan los checks, ya cargado para la primera petición
+import altas_bd, altas_calculo, altas_cubo, altas_informe, altas_taxonomia  # noqa: F401
+
+BASE_DIR = Path(__file__).resolve().parent
+PUERTO   = int(os.environ.get("ALTAS_PUERTO", 47011))
+FIN      = "\x00"                        # FIN + código de salida cierra la respuesta
+
+_turno = threading.Lock()               # una petición (o recarga) cada vez
+
+
+# -------------- PETICIONES ----------------------------------------------------
+def ejecutar(script: Path, args, cwd=None) -> int:
+    """Ejecuta el script como si fuera __main__; devuelve su código de salida."""
+    argv, antes = sys.argv, os.getcwd()
+    sys.argv = [str(script), *args]
+    g = {"__name__": "__main__", "__file__": str(script), "__builtins__": __builtins__}
+    try:
+        if cwd:
+            os.chdir(cwd)
+        exec(compile(script.read_bytes(), str(script), "exec"), g)
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        return 1
+    finally:
+        sys.argv = argv
+        os.chdir(antes)
+        for v in list(g.values()):            # precargas que el script no llegó a esperar
+            if isinstance(v, CacheAltas):
+                v.cerrar()
+
+
+class _Peticion(socketserver.StreamRequestHandler):
+    """
+    Una línea JSON {"script", "args", "cwd"}; después, lo que escriba el
+    cliente es la entrada estándar del script y lo que imprima el script
+    vuelve al cliente.
+    """
+
+    def handle(self):
+        try:
+            pet = json.loads(self.rfile.readline())
+            script = BASE_DIR / Path(pet["script"]).name
+            args   = [str(a) for a in pet.get("args", [])]
+        except (ValueError, KeyError, TypeError):
+            return
+        salida = io.TextIOWrapper(self.wfile, encoding="utf-8", errors="replace",
+                                  write_through=True)
+        if not (script.name.startswith("checks_altas") and script.suffix == ".py"
+                and script.exists()):
+            salida.write(f"❌ Script desconocido: {script.name}\n{FIN}2\n")
+            return
+        if "--vigilar" in args:
+            salida.write(f"❌ --vigilar no se puede pedir al servidor: lanza el script directamente.\n{FIN}2\n")
+            return
+
+        t0 = time.perf_counter()
+        with _turno, redirect_stdout(salida), redirect_stderr(salida):
+            stdin, sys.stdin = sys.stdin, io.TextIOWrapper(self.rfile, encoding="utf-8")
+            try:
+                codigo = ejecutar(script, args, pet.get("cwd"))
+            finally:
+                sys.stdin = stdin
+        try:
+            salida.write(f"{FIN}{codigo}\n")
+        except OSError:
+            pass                          # el cliente ya se ha ido
+        print(f"📨 {script.name} {' '.join(args)} → {codigo} ({time.perf_counter() - t0:.2f} s)")
+        vigilar_nuevos()
+
+
+class Servidor(socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+# -------------- RECARGA AL CAMBIAR EL LIBRO -----------------------------------
+_vigilados: set[str] = set()
+
+
+def _recargar(src: Path):
+    """Pone al día en memoria las hojas que ya estaban cargadas de «src»."""
+    with _turno:                          # sin petición en curso: print va a la consola
+        try:
+            cache = CacheAltas(src)
+            pet   = [(h, p) for (s, h, p) in list(altas_cache.MEMORIA)
+                     if s == str(src) and h in cache.hojas]
+            cache.cargar(pet, avisar=False)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ No se pudo recargar «{src.name}» ({e})")
+            return
+        print(f"🔄 {src.name} recargado ({len(pet)} hoja(s)/perfil(es))")
+
+
+def _vigilar(src: Path):
+    visto = estado(src)
+    while True:
+        visto = esperar_cambio(src, visto)
+        _recargar(src)
+
+
+def vigilar_nuevos():
+    """Un hilo de vigilancia por cada libro que haya entrado en memoria."""
+    for src in {s for s, _, _ in list(altas_cache.MEMORIA)} - _vigilados:
+        _vigilados.add(src)
+        threading.Thread(target=_vigilar, args=(Path(src),), daemon=True,
+                         name=f"vigilancia {Path(src).name}").start()
+
+
+def main(puerto=PUERTO):
+    altas_cache.MEMORIA = {}
+    with Servidor(("127.0.0.1", puerto), _Peticion) as srv:
+        print(f"🟢 Servidor de altas en 127.0.0.1:{puerto} (Ctrl+C para terminar)")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            print("👋 Servidor detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+altas_taxonomia.py
+------------------
+Vocabulario del libro de altas (planes, servicios, estados de FECHA ALTA)
+compilado a códigos enteros.
+
+La hoja FORMULAS del propio libro es la lista maestra de planes y servicios
+(la que usan los desplegables). Se une con los planes/servicios que pide cada
+informe (PLANES, SERVS) y se compila una vez:
+
+    tax = cargar_taxonomia(cache, PLANES, SERVS)
+    raw["_PLAN_COD"] = tax.codigos_plan(raw["PLAN"])           # −1: ninguno
+    raw["_SRV_BITS"] = tax.bits_servicio(raw["SERVICIOS"])     # 1 bit por grupo
+    raw["_ESTADO"]   = tax.codigos_estado(raw["FECHA ALTA ORIGINAL"])  # 0: ninguno
+
+(Los informes sacan el estado junto con la fecha: altas_normaliza.fecha_excel
+con tax.estados; codigos_estado queda para textos sueltos.)
+
+Cada texto distinto se evalúa una sola vez; después, clasificar una fila es
+comparar enteros. La taxonomía compilada se guarda en la caché
+(«taxonomia.json») con la huella de la hoja FORMULAS: mientras no cambie la
+hoja, no se vuelve a leer. Un plan o servicio nuevo en FORMULAS recibe su
+código sin tocar el código; los informes siguen sacando solo las filas de sus
+PLANES y SERVS.
+"""
+from __future__ import annotations
+import hashlib, json, os, re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+HOJA_FORMULAS = "FORMULAS"
+
+# Súbelo si cambia la forma de compilar: invalida las taxonomías guardadas
+VERSION_TAXONOMIA = 1
+
+# Textos de FECHA ALTA que marcan un alta con incidencia (sin distinguir
+# mayúsculas; basta con que aparezcan dentro del texto)
+ESTADOS_INCID = ["T/A", "RECHAZADO", "RECHAZA", "ANULADA", "FALTA", "PENDIENTE"]
+
+
+@lru_cache(maxsize=None)
+def patron_tokens(toks: tuple[str, ...]) -> re.Pattern:
+    """Regex «palabra completa» de un grupo de tokens; se compila una vez."""
+    return re.compile(r"(?<![A-Z0-9])(?:" + "|".join(map(re.escape, toks)) + r")(?![A-Z0-9])")
+
+
+def _por_unico(serie: pd.Series, f, dtype, defecto) -> np.ndarray:
+    """f() aplicada a cada valor distinto de la serie (NaN → defecto)."""
+    codigos, unicos = pd.factorize(serie)            # NaN → -1
+    valores = np.array([f(u) for u in unicos] + [defecto], dtype=dtype)
+    return valores[codigos]                          # -1 → último → defecto
+
+
+class Taxonomia:
+    """
+    planes:    lista de planes; el código de una fila es la posición del plan
+               más largo por el que empieza su PLAN (como str.startswith).
+    servicios: {grupo: tokens}; bit i ↔ i-ésimo grupo (palabra completa).
+    estados:   textos de incidencia; código i+1 ↔ el primero de la lista que
+               aparece dentro del texto (sin distinguir mayúsculas).
+    """
+
+    def __init__(self, planes, servicios, estados=ESTADOS_INCID):
+        self.planes    = list(planes)
+        self.servicios = {k: list(v) for k, v in servicios.items()}
+        self.estados   = list(estados)
+        if len(self.servicios) > 63:
+            raise ValueError("Demasiados grupos de servicio para un int64")
+
+    # ---------------------------------------------------------------------
+    def cod_plan(self, plan) -> int:
+        return self.planes.index(plan)
+
+    def bit_servicio(self, grupo) -> int:
+        return 1 << list(self.servicios).index(grupo)
+
+    def codigos_plan(self, serie: pd.Series) -> np.ndarray:
+        por_largo = sorted(range(len(self.planes)), key=lambda i: -len(self.planes[i]))
+
+        def codigo(v):
+            if isinstance(v, str):
+                for i in por_largo:
+                    if v.startswith(self.planes[i]):
+                        return i
+            return -1
+        return _por_unico(serie, codigo, np.int16, -1)
+
+    def marcas_plan(self, serie: pd.Series, planes) -> np.ndarray:
+        """
+        Matriz filas × planes del informe: PLAN empieza por cada uno (cada
+        plan por separado, como str.startswith). Un plan más largo de FORMULAS
+        («GAS TUR») no le quita filas a «GAS».
+        """
+        codigos, unicos = pd.factorize(serie)            # NaN → -1
+        marcas = np.array([[isinstance(u, str) and u.startswith(p) for p in planes]
+                           for u in unicos] + [[False] * len(planes)], dtype=bool)
+        return marcas.reshape(-1, len(planes))[codigos]
+
+    def bits_servicio(self, serie: pd.Series) -> np.ndarray:
+        patrones = [patron_tokens(tuple(t)) for t in self.servicios.values()]
+
+        def bits(v):
+            if not isinstance(v, str):
+                return 0
+            return sum(1 << i for i, p in enumerate(patrones) if p.search(v))
+        return _por_unico(serie, bits, np.int64, 0)
+
+    def codigos_estado(self, serie: pd.Series) -> np.ndarray:
+        estados = [e.upper() for e in self.estados]
+
+        def codigo(v):
+            txt = str(v).upper()
+            return next((i + 1 for i, e in enumerate(estados) if e in txt), 0)
+        return _por_unico(serie, codigo, np.int8, 0)
+
+    # ---------------------------------------------------------------------
+    def a_dict(self) -> dict:
+        return {"planes": self.planes, "servicios": self.servicios, "estados": self.estados}
+
+    @classmethod
+    def desde_formulas(cls, df: pd.DataFrame, planes, servicios) -> "Taxonomia":
+        """
+        Une los planes/servicios del informe (primero, en su orden) con los de
+        la hoja FORMULAS (perfil «formulas») que aún no estén. Cada servicio
+        nuevo es su propio grupo; «NO» no es un servicio.
+        """
+        planes, servicios = list(planes), {k: list(v) for k, v in servicios.items()}
+        if "PLAN" in df.columns:
+            for p in df["PLAN"].dropna().astype(str).str.strip():
+                if p and p not in planes:
+                    planes.append(p)
+        if "SERVICIOS" in df.columns:
+            conocidos = {t for toks in servicios.values() for t in toks}
+            for s in df["SERVICIOS"].dropna().astype(str).str.strip():
+                tok = re.sub(r"\s+", " ", s.upper())
+                if tok and tok != "NO" and tok not in conocidos:
+                    servicios[s] = [tok]
+                    conocidos.add(tok)
+        return cls(planes, servicios)
+
+
+# -------------- CARGA (con caché) ------------------------------------------
+def cargar_taxonomia(cache, planes, servicios) -> Taxonomia:
+    """
+    Taxonomía del libro de «cache» (altas_cache.CacheAltas) para un informe
+    con esos planes y servicios. Sin hoja FORMULAS → solo los del informe.
+    """
+    base = Taxonomia(planes, servicios)
+    huella = (cache.huellas or {}).get(HOJA_FORMULAS)
+    if huella is None:
+        return base
+
+    # una entrada por informe (cada uno pide sus planes/servicios)
+    clave = hashlib.sha1(json.dumps([VERSION_TAXONOMIA, base.a_dict()],
+                                    ensure_ascii=False).encode()).hexdigest()
+    f = cache.dir / "taxonomia.json"
+    try:
+        guardadas = json.loads(f.read_text(encoding="utf-8"))
+        if guardadas.get("huella") != huella:
+            guardadas = {}
+    except (OSError, ValueError, AttributeError):
+        guardadas = {}
+    if clave in guardadas.get("entradas", {}):
+        return Taxonomia(**guardadas["entradas"][clave])
+
+    # a través del hilo de la caché: no compite con una precarga en curso
+    df = cache.en_segundo_plano([(HOJA_FORMULAS, "formulas")]).result()[HOJA_FORMULAS, "formulas"]
+    tax = Taxonomia.desde_formulas(df, planes, servicios)
+    try:
+        cache.dir.mkdir(exist_ok=True)
+        tmp = f.with_suffix(".tmp")
+        entradas = {**guardadas.get("entradas", {}), clave: tax.a_dict()}
+        tmp.write_text(json.dumps({"huella": huella, "entradas": entradas},
+                                  ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, f)
+    except OSError:
+        pass                               # sin caché: se recompila la próxima vez
+    return tax
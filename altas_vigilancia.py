@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+altas_vigilancia.py
+-------------------
+Modo vigilancia de los checks (--vigilar): el proceso se queda abierto con las
+hojas ya normalizadas en memoria y, cada vez que cambia
+2025_TRAMITACION_DE_ALTAS.xlsx, rehace el informe.
+
+    vivos = DatosVivos(cache, frames)          # lo ya cargado por el script
+    for cambiadas in vivos.cambios():          # espera al siguiente cambio
+        generar(vivos.cache, vivos.frames)
+
+Detección por sondeo (mtime y tamaño cada INTERVALO s): OneDrive escribe el
+fichero en varias tandas, así que un cambio solo cuenta cuando el fichero lleva
+CALMA s sin moverse. Entonces se abre una caché nueva (altas_cache.py) y solo
+se vuelven a pedir las hojas cuya huella ha cambiado; dentro de ellas, solo se
+normalizan las filas nuevas o editadas. El resto sigue en memoria.
+
+Ctrl+C termina la vigilancia.
+"""
+from __future__ import annotations
+import time
+from datetime import datetime, timedelta
+from altas_cache import CacheAltas
+
+INTERVALO = 5.0                         # s entre dos miradas al fichero
+CALMA     = 10.0                        # s sin cambios para darlo por escrito
+
+
+def estado(src):
+    """(mtime, tamaño) del fichero, o None si no está (OneDrive lo sustituye)."""
+    try:
+        st = src.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def esperar_cambio(src, visto, intervalo=INTERVALO, calma=CALMA, limite=None):
+    """
+    Sondea «src» hasta que su estado es distinto de «visto» y lleva «calma» s
+    sin cambiar. Devuelve el estado nuevo, o None si antes llega «limite».
+    """
+    paso = min(intervalo, 1.0)
+    while limite is None or datetime.now() < limite:
+        ahora = estado(src)
+        if ahora is not None and ahora != visto:
+            quieto = time.monotonic()
+            while time.monotonic() - quieto < calma:
+                time.sleep(paso)
+                otro = estado(src)
+                if otro != ahora:
+                    ahora, quieto = otro, time.monotonic()
+            if ahora is not None and ahora != visto:
+                return ahora
+        time.sleep(intervalo)
+    return None
+
+
+class DatosVivos:
+    """
+    Frames {(hoja, perfil): DataFrame} que se mantienen al día con el libro.
+    Se parte de lo que el script ya ha cargado con «cache».
+    """
+
+    def __init__(self, cache: CacheAltas, frames, peticiones=None):
+        self.cache  = cache
+        self.frames = frames
+        self.peticiones = list(peticiones if peticiones is not None else frames)
+        self.huellas = dict(cache.huellas)
+
+    def refrescar(self) -> list[str]:
+        """Relee las hojas pedidas que hayan cambiado; devuelve cuáles."""
+        cache    = CacheAltas(self.cache.src, self.cache.dir)
+        cambian  = [h for h, x in cache.huellas.items() if self.huellas.get(h) != x]
+        faltan   = [p for p in self.peticiones if p[0] in cambian]
+        self.frames.update(cache.cargar(faltan))
+        self.cache, self.huellas = cache, dict(cache.huellas)
+        return cambian
+
+    def cambios(self, cada_dia=True):
+        """
+        Generador: espera al siguiente cambio del libro, refresca y devuelve
+        las hojas que han cambiado. cada_dia → también a medianoche (lista
+        vacía), para periodos que acaban «hoy».
+        """
+        visto = tuple(self.cache.stat)           # versión de la que salen los frames
+        print(f"👀 Vigilando «{self.cache.src.name}» (Ctrl+C para terminar)")
+        try:
+            while True:
+                manana = datetime.combine(datetime.today().date() + timedelta(days=1),
+                                          datetime.min.time())
+                nuevo = esperar_cambio(self.cache.src, visto, limite=manana if cada_dia else None)
+                if nuevo is None:
+                    print(f"📅 Nuevo día ({datetime.today():%d-%m-%Y})")
+                    yield []
+                    continue
+                try:
+                    cambian = self.refrescar()
+                except (OSError, ValueError) as e:   # bloqueado, hoja renombrada…
+                    print(f"⚠️ No se pudo releer el libro ({e}); se reintenta en unos segundos.")
+                    continue
+                visto = nuevo
+                if not cambian:
+                    continue                  # solo ha cambiado la fecha del fichero
+                print(f"🔄 {datetime.now():%H:%M:%S} Cambios en:", ", ".join(cambian))
+                yield cambian
+        except KeyboardInterrupt:
+            print("👋 Vigilancia terminada.")
@@ -7,34 +7,43 @@ coinciden con la hoja ABRIL de 2025_TRAMITACION_DE_ALTAS.xlsx para el rango
 que el usuario indique.
 """
 from __future__ import annotations
-import re, sys
 from pathlib import Path
 from datetime import datetime
 import pandas as pd
 from openpyxl import load_workbook
 from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 from openpyxl.utils import get_column_letter
-import unicodedata
-from pandas._libs.tslibs.timestamps import Timestamp
+from altas_cache import CacheAltas
+from altas_calculo import contains, contar, marcar_filas, marcar_servicios
+from altas_normaliza import fecha_excel
+from altas_opciones import leer_opciones, pedir_fechas, pedir_hojas, ruta_salida
+from altas_taxonomia import cargar_taxonomia
 
 # ---------------- CONFIG ----------------------------------------------------
 BASE_DIR = Path(r"C:\Users\ofici\OneDrive\ESCRITORIO IBERDROLA\PROGRAMACION\Proyecto_Check_Altas")
 #BASE_DIR = Path(r"C:\Users\X\OneDrive\ESCRITORIO IBERDROLA\PROGRAMACION\Proyecto_Check_Altas")
 SRC_XLS  = BASE_DIR / "2025_TRAMITACION_DE_ALTAS.xlsx"
-if len(sys.argv) >= 4:
-    SHEETS = [sys.argv[3].strip().upper()]
-else:
-    hoja = input("📄 ¿Qué hoja quieres analizar? (por ejemplo, MAYO. TRAMITACION aún no la lee): ").strip().upper()
-    SHEETS = [hoja]
+# Argumentos / --config (ver altas_opciones.py); con --batch no se pregunta nada
+opts   = leer_opciones(__doc__, por_colaborador=False, abrir=False)   # no abre el Excel
+
+# Carga en segundo plano mientras se contestan las preguntas: las hojas que
+# siguen a TRAMITACION (los meses en curso) desde ya; la elegida, al elegirla
+cache   = CacheAltas(SRC_XLS)
+cache.en_segundo_plano([(s, "mes") for s in cache.hojas_tram[1:]])
+SHEETS  = pedir_hojas(opts, "📄 ¿Qué hoja quieres analizar? (por ejemplo, MAYO. TRAMITACION aún no la lee): ")
+f_mes   = cache.en_segundo_plano([(s, "mes") for s in SHEETS])
+
+# -------------- DATES -------------------------------------------------------
+d_ini, d_fin = pedir_fechas(opts)
 
 PLANES    = ["2,0 TD_1", "2,0 TD_2", "2,0 TD_3", "3,0 TD"]
 SERVS     = {"PIH":["PIH"], "PEH+":["PEH+"], "UUEEn/UUEE":["UUEEN","UUEE"], "PTG":["PTG"]}
 OFERTA    = "EXCLUSIVO 10% TF/TV"
 
 # -------------- HELPERS -----------------------------------------------------
-def contains(series: pd.Series, toks: list[str]):
-    pat = r"(?<![A-Z0-9])(?:" + "|".join(map(re.escape, toks)) + r")(?![A-Z0-9])"
-    return series.str.contains(pat, na=False, regex=True)
+# marcas de SERVS / OFERTA: cada texto distinto se evalúa una vez (ver altas_taxonomia.py)
+COL_SRV    = {k: f"_SRV {k}" for k in SERVS}
+COL_OFERTA = "_OFERTA"
 
 def auto_width(ws):
     for col in ws.columns:
@@ -42,139 +51,70 @@ def auto_width(ws):
             max(len(str(c.value)) for c in col if c.value) + 2
         )
 
-def ask_date(msg: str):
-    while True:
-        txt = input(f"{msg} (dd-mm-aaaa): ").strip()
-        try:
-            return pd.to_datetime(txt, format="%d-%m-%Y")
-        except ValueError:
-            print("❌ Formato incorrecto.")
-
 # -------------- LOAD --------------------------------------------------------
 print("⏳ Cargando …")
-raw = pd.concat(
-    [pd.read_excel(SRC_XLS, sheet_name=s, engine="openpyxl") for s in SHEETS],
-    ignore_index=True,
-).drop_duplicates()
-
-# ─── Normaliza cabeceras (tildes, espacios, mayúsculas) ─────────────────────
-def sin_tildes(txt):
-    return "".join(c for c in unicodedata.normalize("NFKD", txt)
-                   if not unicodedata.combining(c))
-
-raw.columns = [sin_tildes(col).upper().strip() for col in raw.columns]
-
-# ─── Renombra columnas erróneas (por si aparece mal escrito) ───────────────
-raw.rename(columns={
-    "CODIGO COMERCIAL": "CODIGO COMERCIAL",
-    "CODICO COMERCIAL": "CODIGO COMERCIAL"
-}, inplace=True)
-
-# ─── FILTRA FILAS CON CABECERAS PEGADAS O VACÍAS ───────────────────────────
-header_like = set(raw.columns)
-header_like.update({"DOC. SUBIDA"})
-raw = raw[~raw["COLABORADOR"].str.upper().isin(header_like)]
-raw = raw[raw["COLABORADOR"].str.strip() != ""]
-
-# ─── Normaliza campos de texto clave ───────────────────────────────────────
-for c in ["PUNTO ATENCION","SERVICIOS","COMUNIDAD","OFERTA PRESENTADA","COLABORADOR"]:
-    raw[c] = raw[c].astype(str).str.upper().str.strip().str.replace(r"\s+", " ", regex=True)
-
-    # ─── Convierte a fecha y elimina valores no escalares en CAIDAS ────────────
-for c in ["FECHA FIRMA", "FECHA ALTA", "CAIDAS"]:
-    raw[c] = pd.to_datetime(raw[c], errors="coerce")
-
-from pandas._libs.tslibs.timestamps import Timestamp
-raw.loc[~raw["CAIDAS"].apply(lambda x: isinstance(x, Timestamp)), "CAIDAS"] = pd.NaT
-raw.loc[~raw["FECHA ALTA"].apply(lambda x: isinstance(x, Timestamp)), "FECHA ALTA"] = pd.NaT
+# cabeceras, filas-cabecera y campos de texto ya normalizados (perfil «mes»)
+frames = f_mes.result()
+raw = pd.concat([frames[s, "mes"] for s in SHEETS]).drop_duplicates()
 
-# -------------- DATES -------------------------------------------------------
-if len(sys.argv) >= 3:
-    d_ini = pd.to_datetime(sys.argv[1], format="%d-%m-%Y")
-    d_fin = pd.to_datetime(sys.argv[2], format="%d-%m-%Y")
-else:
-    print("⚠️ Sin fechas → pedir.")
-    d_ini = ask_date("Desde")
-    d_fin = ask_date("Hasta")
+# ─── Códigos de servicio, plan y estado; marcas de oferta y sede ──────
+# (vocabulario de la hoja FORMULAS, compilado y guardado en la caché)
+tax = cargar_taxonomia(cache, PLANES, SERVS)
+
+    # ─── Convierte a fecha (fecha real, número o dd/mm/aaaa) en una pasada ────
+# FECHA ALTA sale del texto original con su estado: T/A, RECHAZADO… → > 0
+raw["FECHA ALTA"], raw["_ESTADO"] = fecha_excel(raw["FECHA ALTA ORIGINAL"], tax.estados)
+for c in ["FECHA FIRMA", "CAIDAS"]:
+    raw[c] = fecha_excel(raw[c])[0]
+
+marcar_servicios(raw, tax, SERVS)
+raw[COL_OFERTA] = contains(raw["OFERTA PRESENTADA"], [OFERTA])
+marcar_filas(raw, PLANES, tax)
 
 mask_alta   = raw["FECHA ALTA"].between(d_ini, d_fin, "both")
 mask_firma  = raw["FECHA FIRMA"].between(d_ini, d_fin, "both")
 mask_caida  = raw["CAIDAS"].between(d_ini, d_fin, "both")
-mask_alta_null  = raw["FECHA ALTA"].isna()
 mask_caida_null = raw["CAIDAS"].isna()
 
 ALTAS = raw[mask_alta & mask_caida_null]
-# Recupera texto original de FECHA ALTA
-raw["FECHA ALTA ORIGINAL"] = (
-    pd.read_excel(SRC_XLS, sheet_name=hoja, engine="openpyxl")
-      ["FECHA ALTA"]
-)
+# Incidencia: FECHA ALTA con uno de los textos de estado (sin fecha de alta)
 INCID = raw[
     mask_firma &
     mask_caida_null &
-    mask_alta_null &
-    raw["FECHA ALTA ORIGINAL"].notna() &
-    raw["FECHA ALTA ORIGINAL"].astype(str).str.contains(r"T/A|RECHAZADO|RECHAZA|ANULADA|FALTA|PENDIENTE", case=False, na=False)
+    (raw["_ESTADO"] > 0)
 ]
 
 BAJAS = raw[mask_caida]
 
 # -------------- TOTAL_GLOBAL ------------------------------------------------
-rows = []
-raw["CODIGO COMERCIAL"] = raw["CODIGO COMERCIAL"].astype(str).str.upper().str.strip().str.replace(r"\s+", " ", regex=True)
-
-
-# Códigos comerciales por ubicación
-
-#MIERES
-M_CODE = ["YB19010-ANA-3188168", "YB99670-ADRIAN-155292"]
-#LENA
-L_CODE = ["YB33990-ELI-3189791"]
-#PYMES
-P_CODE = ["YA8541- GERAR- 3184474"]
-
-def is_mieres(df):
-    return df["CODIGO COMERCIAL"].isin(M_CODE)
-
-def is_lena(df):
-    return df["CODIGO COMERCIAL"].isin(L_CODE)
-
-def is_pymes(df):
-    return df["CODIGO COMERCIAL"].isin(P_CODE) & df["PLAN"].isin(["2,0 TD_3", "3,0 TD"])
-
-def add(tipo, df_a, df_b):
+# plan / oferta / servicio × [filas, NO_AST, LENA, MIERES, PYMES] en una pasada
+# por tabla, con las etiquetas de sede y Asturias puestas una vez en raw
+def add(tipo, a, b):
+    a, b = [int(x) for x in a], [int(x) for x in b]
     rows.append({
         "TIPO": tipo,
-        "ALTAS": df_a.shape[0],
-        "BAJAS": df_b.shape[0],
-        "NO_ASTURIAS": df_a[df_a["COMUNIDAD"]!="ASTURIAS"].shape[0],
-        "TOTALES": df_a.shape[0] - df_b.shape[0] - df_a[df_a["COMUNIDAD"]!="ASTURIAS"].shape[0],
-        "ALTAS_LENA": df_a[is_lena(df_a)].shape[0],
-        "BAJAS_LENA": df_b[is_lena(df_b)].shape[0],
-        "ALTAS_MIERES": df_a[is_mieres(df_a)].shape[0],
-        "BAJAS_MIERES": df_b[is_mieres(df_b)].shape[0],
-        "ALTAS_PYMES": df_a[is_pymes(df_a)].shape[0],
-        "BAJAS_PYMES": df_b[is_pymes(df_b)].shape[0],
+        "ALTAS": a[0],
+        "BAJAS": b[0],
+        "NO_ASTURIAS": a[1],
+        "TOTALES": a[0] - b[0] - a[1],
+        "ALTAS_LENA": a[2],
+        "BAJAS_LENA": b[2],
+        "ALTAS_MIERES": a[3],
+        "BAJAS_MIERES": b[3],
+        "ALTAS_PYMES": a[4],
+        "BAJAS_PYMES": b[4],
 
     })
 
 
-for p in PLANES:
-    add(p,
-        ALTAS[ALTAS["PLAN"].str.startswith(p,na=False)],
-        BAJAS[BAJAS["PLAN"].str.startswith(p,na=False)]
-    )
-add("Plan Exclusivo 10%",
-    ALTAS[contains(ALTAS["OFERTA PRESENTADA"], [OFERTA])],
-    BAJAS[contains(BAJAS["OFERTA PRESENTADA"], [OFERTA])]
-)
-for k,toks in SERVS.items():
-    add(k,
-        ALTAS[contains(ALTAS["SERVICIOS"], toks)],
-        BAJAS[contains(BAJAS["SERVICIOS"], toks)]
-    )
+rows = []
+tipos = PLANES + ["Plan Exclusivo 10%"] + list(SERVS)
+cols  = [f"_PLAN {p}" for p in PLANES] + [COL_OFERTA] + list(COL_SRV.values())
+for tipo, a, b in zip(tipos, contar(ALTAS, cols), contar(BAJAS, cols)):
+    add(tipo, a, b)
 
-add("ALTAS CON INCIDENCIA", INCID, INCID)
+n_incid = contar(INCID)[0]
+add("ALTAS CON INCIDENCIA", n_incid, n_incid)
 
 
 
@@ -195,22 +135,15 @@ plan_baj = (
 plan_alt.columns = [f"PLAN_{c}_ALTA"  for c in plan_alt.columns]
 plan_baj.columns = [f"PLAN_{c}_CAIDA" for c in plan_baj.columns]
 
-serv_alt = ALTAS.groupby("COLABORADOR").apply(
-    lambda df: pd.Series({
-        f"SERVICIO_{k}_ALTA": contains(df["SERVICIOS"], toks).sum()
-        for k,toks in SERVS.items()
-    })
-)
-serv_baj = BAJAS.groupby("COLABORADOR").apply(
-    lambda df: pd.Series({
-        f"SERVICIO_{k}_CAIDA": contains(df["SERVICIOS"], toks).sum()
-        for k,toks in SERVS.items()
-    })
-)
+# servicios: una sola suma por colaborador sobre las marcas _SRV
+serv_alt = (ALTAS.groupby("COLABORADOR")[list(COL_SRV.values())].sum()
+                 .set_axis([f"SERVICIO_{k}_ALTA" for k in COL_SRV], axis=1))
+serv_baj = (BAJAS.groupby("COLABORADOR")[list(COL_SRV.values())].sum()
+                 .set_axis([f"SERVICIO_{k}_CAIDA" for k in COL_SRV], axis=1))
 
-of_alt = (ALTAS[contains(ALTAS["OFERTA PRESENTADA"],[OFERTA])]
+of_alt = (ALTAS[ALTAS[COL_OFERTA]]
           .groupby("COLABORADOR").size().to_frame(f"OFERTA_{OFERTA}_ALTA"))
-of_baj = (BAJAS[contains(BAJAS["OFERTA PRESENTADA"],[OFERTA])]
+of_baj = (BAJAS[BAJAS[COL_OFERTA]]
           .groupby("COLABORADOR").size().to_frame(f"OFERTA_{OFERTA}_CAIDA"))
 
 por_colab = (plan_alt.join(plan_baj,how="outer")
@@ -225,7 +158,7 @@ por_colab_t.columns = ["INDICADOR"] + por_colab_t.columns[1:].tolist()
 valid = por_colab_t["INDICADOR"].str.match(r"^(PLAN_|OFERTA_|SERVICIO_)")
 por_colab_t = por_colab_t[valid].reset_index(drop=True)
 # -------------- EXPORT ------------------------------------------------------
-out = BASE_DIR / f"Resumen_ALTAS_Colaboradores{datetime.today():%Y-%m-%d}.xlsx"
+out = ruta_salida(opts, BASE_DIR / f"Resumen_ALTAS_Colaboradores{datetime.today():%Y-%m-%d}.xlsx")
 with pd.ExcelWriter(out, engine="openpyxl") as writer:
     por_colab_t.to_excel(writer, sheet_name="POR_COLABORADOR", index=False)
     total_global.to_excel(writer, sheet_name="TOTAL_GLOBAL",   index=False)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+checks_altasFILTRO_PERIODOS.py
+------------------------------
+TOTAL_GLOBAL y POR_COLABORADOR (mismo cálculo que el check por FECHA FIRMA)
+para varios periodos a la vez, en un único Excel. El libro de altas se carga y
+normaliza una sola vez y de ahí sale un cubo de sumas acumuladas por fecha
+(altas_cubo.py) que se guarda en la caché: mientras esas hojas no cambien,
+cada periodo son unas pocas restas, sin volver a cargar el libro.
+
+    python checks_altasFILTRO_PERIODOS.py --hojas ABRIL MAYO \\
+           --periodo 01-04-2025:30-04-2025 --periodo 01-05-2025:31-05-2025
+
+    python checks_altasFILTRO_PERIODOS.py --hojas MAYO JUNIO --hasta hoy \\
+           --semanas 4 --mes-en-curso --batch
+
+Con --bd las filas salen del histórico SQLite (altas_bd.py), así que también
+valen meses que ya se han borrado del libro.
+"""
+from __future__ import annotations
+import sys
+from pathlib import Path
+from datetime import datetime
+import warnings
+from altas_bd import BaseAltas
+from altas_cache import CacheAltas
+from altas_calculo import PLANES, SERVS, calcular_periodo, preparar
+from altas_cubo import Cubo, ruta_cubo
+from altas_informe import hoja_resumen, libro_vacio, texto_periodo
+from altas_opciones import leer_opciones, pedir_hojas, pedir_periodo, ruta_salida
+from altas_taxonomia import cargar_taxonomia
+
+warnings.filterwarnings("ignore", category=UserWarning)
+warnings.filterwarnings("ignore", category=FutureWarning)
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+# ---------------- CONFIG ----------------------------------------------------
+BASE_DIR = Path(r"C:\Users\ofici\OneDrive\ESCRITORIO IBERDROLA\PROGRAMACION\Proyecto_Check_Altas")
+#BASE_DIR = Path(r"C:\Users\X\OneDrive\ESCRITORIO IBERDROLA\PROGRAMACION\Proyecto_Check_Altas")
+SRC_XLS  = BASE_DIR / "2025_TRAMITACION_DE_ALTAS.xlsx"
+
+opts   = leer_opciones(__doc__, por_colaborador=False, periodos=True, bd=True)
+
+# Carga en segundo plano mientras se contestan las preguntas (TRAMITACION y
+# sus 2 siguientes desde ya, los meses en cuanto se eligen)
+cache   = CacheAltas(SRC_XLS)
+tram_ss = cache.hojas_tram
+f_tram  = cache.en_segundo_plano([(s, "tram") for s in tram_ss] +
+                                 [(s, "mes") for s in tram_ss[1:]])
+
+SHEETS = pedir_hojas(opts, "📄 ¿Qué mes(es) quieres analizar? (separados por espacio): ")
+if not opts.hojas:
+    SHEETS = SHEETS[0].split()
+
+
+# Con --bd: histórico al día con lo que haya cambiado en el libro
+bd      = BaseAltas(SRC_XLS) if opts.bd else None
+huellas = None
+if bd:
+    bd.ingerir(cache)
+    huellas = {h: x for (h, _), x in bd.huellas().items()}
+
+# Cubo ya hecho para estas hojas → no hace falta cargar los meses
+tax   = cargar_taxonomia(cache, PLANES, SERVS)
+ruta  = ruta_cubo(cache, SHEETS, tram_ss, tax, huellas)
+cubo  = Cubo.cargar(ruta)
+f_mes = None if cubo or bd else cache.en_segundo_plano([(s, "mes") for s in SHEETS])
+
+PERIODOS = opts.periodos
+if not PERIODOS:
+    print("⚠️ Sin periodos → pedir.")
+    while True:
+        if PERIODOS and input("¿Otro periodo? (S/N): ").strip().upper() != "S":
+            break
+        PERIODOS.append(pedir_periodo())
+
+# -------------- LOAD --------------------------------------------------------
+def cargar_datos():
+    print("⏳ Cargando hoja(s):", ", ".join(SHEETS))
+    if bd:
+        frames = bd.cargar([(s, "mes") for s in SHEETS] + [(s, "tram") for s in tram_ss])
+    else:
+        meses  = f_mes or cache.en_segundo_plano([(s, "mes") for s in SHEETS])
+        frames = {**f_tram.result(), **meses.result()}
+    return preparar(frames, SHEETS, tram_ss, tax)
+
+datos = None
+if cubo is None:
+    datos = cargar_datos()
+    cubo  = Cubo.construir(datos)
+    cubo.guardar(ruta)
+else:
+    print("🧊 Cubo de periodos desde la caché:", ", ".join(SHEETS))
+
+# -------------- PERIODOS ----------------------------------------------------
+resultados = []
+for d_ini, d_fin in PERIODOS:
+    res = cubo.periodo(d_ini, d_fin)
+    if res is None:                        # fechas con hora… → fila a fila
+        datos = datos or cargar_datos()
+        res   = calcular_periodo(datos, d_ini, d_fin)
+    resultados.append(res)
+print(f"📊 {len(resultados)} periodo(s) calculado(s)")
+
+def nombre_hoja(prefijo, res):
+    # «TG 01-05-25 a 31-05-25» → 22 caracteres (Excel admite 31)
+    return f"{prefijo} {res.d_ini:%d-%m-%y} a {res.d_fin:%d-%m-%y}"
+
+# -------------- EXPORT ------------------------------------------------------
+wb = libro_vacio()
+for res in resultados:
+    per_txt = texto_periodo(res.d_ini, res.d_fin)
+    hoja_resumen(wb, nombre_hoja("TG", res), res.total_global, "TOTAL_GLOBAL",    per_txt)
+    hoja_resumen(wb, nombre_hoja("PC", res), res.por_colab_t,  "POR_COLABORADOR", per_txt)
+
+out = ruta_salida(opts, BASE_DIR / f"Resumen_periodos_{datetime.today():%Y-%m-%d}.xlsx")
+try:
+    wb.save(out)
+except PermissionError:
+    print(f"❌ No puedo guardar «{out.name}». Cierra el archivo si está abierto y vuelve a intentarlo.")
+    sys.exit(1)
+print(f"💾 {out}")
+
+if opts.abrir:
+    import os; os.startfile(out)
+
+print("✅ Fin.")
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+bench_motores.py
+----------------
+Tiempo de lectura por hoja de 2025_TRAMITACION_DE_ALTAS.xlsx con cada motor
+de altas_carga (calamine / openpyxl), y comprobación de que ambos dan los
+mismos DataFrames (valores y tipo de cada celda: fecha real ≠ texto).
+
+    python pruebas\\bench_motores.py [ruta.xlsx] [--repeticiones N]
+"""
+from __future__ import annotations
+import argparse, sys, time, warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from altas_carga import MOTORES, _a_dataframe, _filas_proyectadas, abrir_libro, python_calamine
+from altas_normaliza import COLS_USADAS
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+p.add_argument("xlsx", nargs="?",
+               default=Path(__file__).resolve().parent.parent / "2025_TRAMITACION_DE_ALTAS.xlsx")
+p.add_argument("--repeticiones", type=int, default=5, metavar="N")
+a = p.parse_args()
+
+motores = [m for m in MOTORES if m != "calamine" or python_calamine is not None]
+if len(motores) < len(MOTORES):
+    print("⚠️ python-calamine no está instalado → solo openpyxl")
+
+
+def leer(lector, hoja):
+    _, filas = _filas_proyectadas(lector, hoja, COLS_USADAS)
+    return _a_dataframe(filas)
+
+
+def mejor(f, despues=None):
+    """Mejor tiempo de f() y su último resultado; despues(res) fuera del tiempo."""
+    tiempos = []
+    for i in range(a.repeticiones):
+        t = time.perf_counter()
+        res = f()
+        tiempos.append(time.perf_counter() - t)
+        if despues is not None and i < a.repeticiones - 1:
+            despues(res)
+    return min(tiempos), res
+
+
+# -------------- MEDIDAS -----------------------------------------------------
+t_abrir, tiempos, frames = {}, {}, {}
+for m in motores:
+    # cada lector abierto se cierra antes del siguiente; el último se usa abajo
+    t_abrir[m], lector = mejor(lambda: abrir_libro(a.xlsx, m), lambda l: l.cerrar())
+    hojas = lector.hojas
+    for h in hojas:
+        tiempos[m, h], frames[m, h] = mejor(lambda: leer(lector, h))
+    lector.cerrar()
+
+# -------------- INFORME -----------------------------------------------------
+print(f"📄 {Path(a.xlsx).name} · mejor de {a.repeticiones} (ms)")
+print(f"{'HOJA':<14}{'FILAS':>7}" + "".join(f"{m:>11}" for m in motores) + "   IGUALES")
+print(f"{'(abrir)':<14}{'':>7}" + "".join(f"{t_abrir[m] * 1e3:>11.1f}" for m in motores))
+for h in hojas:
+    dfs = [frames[m, h] for m in motores]
+    iguales = all(d.equals(dfs[0]) and all((d[c].map(type) == dfs[0][c].map(type)).all()
+                                           for c in d.columns) for d in dfs[1:])
+    print(f"{h:<14}{len(dfs[0]):>7}" + "".join(f"{tiempos[m, h] * 1e3:>11.1f}" for m in motores)
+          + f"   {'✅' if iguales else '❌'}")
+tot = {m: t_abrir[m] + sum(tiempos[m, h] for h in hojas) for m in motores}
+print(f"{'TOTAL':<14}{'':>7}" + "".join(f"{tot[m] * 1e3:>11.1f}" for m in motores))